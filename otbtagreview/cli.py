@@ -1,232 +1,402 @@
 import click
-import os
 import json
-import cv2
-import numpy as np
-from otbtagreview.pipeline.video import VideoProcessor
-from otbtagreview.pipeline.board import BoardWarper
-from otbtagreview.pipeline.tags import TagDetector
-from otbtagreview.pipeline.mapping import SquareMapper
-from otbtagreview.pipeline.states import StateManager
-from otbtagreview.pipeline.moves import MoveInferrer
+import os
+import signal
+import sys
+from typing import List, Dict, Optional, Any
+from otbtagreview.pipeline.video import VideoProcessor, VideoIndex
+from otbtagreview.pipeline.board import Calibration
+from otbtagreview.pipeline.tags import TagDetector, resolve_detector_profile, build_detector_parameters, DEFAULT_DETECTOR_PROFILE
+from otbtagreview.pipeline.engine import EngineAnalyzer, AnalysisWorker
+from otbtagreview.pipeline.engine_service import EngineService, EngineClient
+from otbtagreview.pipeline.book import OpeningBook
+from otbtagreview.pipeline.cache import AnalysisCache
+from otbtagreview.pipeline.states import BoardState
+from otbtagreview.pipeline.session import BoardConfig, BoardSession, load_board_configs, union_roi
+from otbtagreview.io.manifests import RunManifest
+from otbtagreview.io.paths import ANALYSIS_FILE, MANIFEST_FILE, STATES_FILE, VIDEO_INDEX_FILE, output_path
+from otbtagreview.config import (
+    ENGINE_LIMITS,
+    DEFAULT_ENGINE_DEPTH,
+    DEFAULT_ENGINE_MOVETIME_MS,
+    DEFAULT_ENGINE_NODES,
+    DEFAULT_ENGINE_SOCKET,
+    DEFAULT_ENGINE_INSTANCES,
+    auto_engine_threads,
+    auto_engine_hash_mb,
+)
 
 @click.group()
 def main():
     pass
 
+def detection_options(f):
+    """
+    Options shared by the video-analysis commands.
+    """
+    options = [
+        click.option('--drift_check_every', default=10, help='With a calibration, check corner drift every N stable frames (0 = never)'),
+        click.option('--drift_tolerance', default=8.0, help='Corner drift in pixels that triggers a homography re-lock'),
+        click.option('--detector_profile', default=DEFAULT_DETECTOR_PROFILE, help='ArUco detector profile: fast, balanced, robust or a profile JSON file'),
+        click.option('--detect_pyramid_level', default=0, help='Detect tags at 1/2^N scale and refine at full resolution (0 = full resolution only)'),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+def engine_options(f):
+    """
+    Stockfish options shared by the analysis commands.
+    """
+    options = [
+        click.option('--engine_path', default='stockfish', help='Path to the Stockfish (UCI) binary'),
+        click.option('--engine_limit', type=click.Choice(ENGINE_LIMITS), default='depth', help='Search limit type'),
+        click.option('--engine_depth', default=DEFAULT_ENGINE_DEPTH, help='Stockfish analysis depth (--engine_limit depth)'),
+        click.option('--engine_movetime', default=DEFAULT_ENGINE_MOVETIME_MS, help='Milliseconds per position (--engine_limit movetime)'),
+        click.option('--engine_nodes', default=DEFAULT_ENGINE_NODES, help='Nodes per position (--engine_limit nodes)'),
+        click.option('--engine_threads', default=0, help='Stockfish threads (0 = auto)'),
+        click.option('--engine_hash', default=0, help='Stockfish hash size in MB (0 = auto)'),
+        click.option('--engine_service', default=DEFAULT_ENGINE_SOCKET, help="Engine service socket, used when running ('' = always spawn Stockfish)"),
+        click.option('--book', 'book_path', default=None, help='Polyglot opening book (.bin); book moves skip engine analysis'),
+        click.option('--multipv', default=1, help='Number of lines Stockfish searches per position'),
+        click.option('--pv_len', default=0, help='Plies of each PV to keep for display (0 = full line)'),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+def make_worker(engine_settings: dict, engines: int = 1, history: Optional[List[Dict[str, Any]]] = None,
+                cache: Optional[AnalysisCache] = None) -> AnalysisWorker:
+    """
+    Build an AnalysisWorker from the engine_options() values. With several
+    engines running side by side, auto-sized threads and hash are split
+    between them.
+    """
+    threads = engine_settings["engine_threads"] or max(1, auto_engine_threads() // engines)
+    hash_mb = engine_settings["engine_hash"] or max(16, auto_engine_hash_mb() // engines)
+    engine = EngineAnalyzer(
+        engine_path=engine_settings["engine_path"],
+        depth=engine_settings["engine_depth"],
+        threads=threads,
+        hash_mb=hash_mb,
+        limit=engine_settings["engine_limit"],
+        movetime_ms=engine_settings["engine_movetime"],
+        nodes=engine_settings["engine_nodes"],
+        multipv=engine_settings["multipv"],
+        pv_len=engine_settings["pv_len"],
+        service_socket=engine_settings["engine_service"]
+    )
+    return AnalysisWorker(engine, OpeningBook(engine_settings["book_path"]), history=history, cache=cache)
+
+def detector_profile_params(spec: Optional[str]) -> Dict[str, Any]:
+    """
+    Resolve a --detector_profile value; an unknown name, unreadable file or
+    unknown DetectorParameters field is reported as a usage error.
+    """
+    try:
+        params = resolve_detector_profile(spec)
+        build_detector_parameters(params)
+    except (ValueError, OSError) as e:
+        raise click.BadParameter(str(e), param_hint='--detector_profile')
+    return params
+
+def run_boards(input_path: str, configs: List[BoardConfig], detector_profile: str, detect_pyramid_level: int,
+               drift_check_every: int, drift_tolerance: float, engine_settings: dict):
+    """
+    Process one video for one or more boards. The video is decoded and
+    motion-scored once and tags are detected once per selected frame; each
+    board keeps its own stability, homography, mapping and move inference.
+    """
+    detector_params = detector_profile_params(detector_profile)
+    video_proc = VideoProcessor(input_path)
+    detector = TagDetector(params=detector_params, pyramid_level=detect_pyramid_level)
+
+    # Start the engines first: each inferred move is analyzed on a worker
+    # thread while the video is still being processed.
+    sessions = {}
+    for config in configs:
+        worker = make_worker(engine_settings, engines=len(configs))
+        try:
+            sessions[config.name] = BoardSession(config, worker, drift_check_every, drift_tolerance,
+                                                 frame_size=video_proc.frame_size,
+                                                 detector_params=detector_params)
+        except ValueError as e:
+            for session in sessions.values():
+                session.worker.finish()
+            raise click.ClickException(str(e))
+        worker.start()
+
+    # With one board the whole frame decides stability (as before); with
+    # several, each board is judged on its own region once it is known.
+    multi = len(sessions) > 1
+    regions = {name: (s.motion_roi if multi else None) for name, s in sessions.items()}
+
+    print("Processing video to find stable frames...")
+    stable_count = 0
+
+    for sf, names in video_proc.get_stable_frames_by_region(regions):
+        stable_count += 1
+        active = [sessions[name] for name in names]
+
+        # One detection pass covering every board that selected this frame.
+        # We detect on original frame for better resolution/quality, then warp centers.
+        tags = detector.detect(sf.frame, roi=union_roi([s.detect_roi for s in active]))
+
+        for session in active:
+            session.process(sf.frame, sf.frame_idx, sf.timestamp, tags)
+            if multi:
+                regions[session.name] = session.motion_roi
+
+    print(f"Found {stable_count} stable frames.")
+    video_proc.release()
+
+    # Settings and seek points for re-running part of the video later (fix)
+    index = video_proc.index()
+    for session in sessions.values():
+        config = session.config
+        RunManifest(
+            input_path=os.path.abspath(input_path),
+            board_name=config.name,
+            corner_ids=config.corner_ids,
+            piece_map=config.piece_map,
+            calibration=config.calibration.to_dict() if config.calibration else None,
+            detector_profile=detector_profile,
+            detector_params=detector_params,
+            detect_pyramid_level=detect_pyramid_level,
+            drift_check_every=drift_check_every,
+            drift_tolerance=drift_tolerance,
+            motion_threshold=video_proc.motion_threshold,
+            stable_duration=video_proc.stable_duration,
+            motion_roi=regions[session.name],
+            engine_settings=engine_settings
+        ).save(output_path(config.outdir, MANIFEST_FILE))
+        index.save(output_path(config.outdir, VIDEO_INDEX_FILE))
+
+    if not stable_count:
+        print("No stable frames found!")
+        for session in sessions.values():
+            session.worker.finish()
+        return
+
+    for session in sessions.values():
+        session.finish()
+
 @main.command()
 @click.option('--input', 'input_path', required=True, help='Path to video file')
 @click.option('--outdir', required=True, help='Output directory')
 @click.option('--piece_map', required=True, help='Path to piece_map.json')
 @click.option('--use_corner_markers', default=1, help='Use corner markers for homography (0 or 1)')
 @click.option('--corners', default='0,1,2,3', help='Corner tag IDs (TL,TR,BR,BL) if use_corner_markers=1')
-@click.option('--engine_depth', default=16, help='Stockfish analysis depth')
-@click.option('--pv_len', default=1, help='PV length for analysis')
-def analyze(input_path, outdir, piece_map, use_corner_markers, corners, engine_depth, pv_len):
+@click.option('--calibration', 'calibration_path', default=None, help='Calibration file from tools.calibrate_board (fixed-mount mode)')
+@detection_options
+@engine_options
+def analyze(input_path, outdir, piece_map, use_corner_markers, corners, calibration_path,
+            drift_check_every, drift_tolerance, detector_profile, detect_pyramid_level, **engine_settings):
     """
     Analyze a chess video and generate PGN + review site.
     """
-    os.makedirs(outdir, exist_ok=True)
-    debug_dir = os.path.join(outdir, 'debug')
-    os.makedirs(debug_dir, exist_ok=True)
-    
-    # 1. Load Piece Map
+    # Load Piece Map
     with open(piece_map, 'r') as f:
         pmap = json.load(f)
-        
-    # 2. Initialize Pipeline Components
-    video_proc = VideoProcessor(input_path)
-    warper = BoardWarper()
-    detector = TagDetector()
-    mapper = SquareMapper()
-    state_mgr = StateManager()
-    move_inf = MoveInferrer(pmap)
-    
-    corner_ids = [int(x) for x in corners.split(',')]
-    
-    print("Processing video to find stable frames...")
-    stable_frames = list(video_proc.get_stable_frames())
-    print(f"Found {len(stable_frames)} stable frames.")
-    
-    if not stable_frames:
-        print("No stable frames found!")
+
+    # Fixed mount: reuse the saved homography, ROI and orientation and skip
+    # per-frame corner detection
+    calibration = None
+    if calibration_path:
+        calibration = Calibration.load(calibration_path)
+        print(f"Using calibration {calibration_path} (ROI {calibration.roi})")
+
+    config = BoardConfig(
+        name="",
+        # A calibration carries the corner IDs it was made with
+        corner_ids=list(calibration.corner_ids) if calibration else [int(x) for x in corners.split(',')],
+        piece_map=pmap,
+        outdir=outdir,
+        calibration=calibration
+    )
+    run_boards(input_path, [config], detector_profile, detect_pyramid_level, drift_check_every, drift_tolerance, engine_settings)
+
+@main.command('analyze-boards')
+@click.option('--input', 'input_path', required=True, help='Path to video file')
+@click.option('--boards', 'boards_path', required=True, help='Boards JSON file (corners, piece map, output dir per board)')
+@detection_options
+@engine_options
+def analyze_boards(input_path, boards_path, drift_check_every, drift_tolerance, detector_profile,
+                   detect_pyramid_level, **engine_settings):
+    """
+    Analyze several boards filmed by one camera in a single pass.
+    """
+    try:
+        configs = load_board_configs(boards_path)
+    except ValueError as e:
+        raise click.ClickException(f"{boards_path}: {e}")
+    if not configs:
+        print(f"No boards defined in {boards_path}")
         return
-        
-    # 3. Process each stable frame
-    # We assume the first stable frame allows us to lock the homography if the camera is static.
-    # Or we recompute per frame if camera moves? 
-    # Spec says "stable mount", but "stabilize homography" suggests we might want to be robust.
-    # Let's try to compute homography on the first frame and reuse, or recompute if possible.
-    # Recomputing per frame is safer if corners are visible.
-    
-    prev_state = None
-    
-    # Save debug info
-    frame_infos = []
-    
-    for sf in stable_frames:
-        frame_idx = sf.frame_idx
-        frame = sf.frame
-        
-        # 3.1 Warp Board
-        # Try to find corners
-        has_homography = warper.find_corners_and_compute_homography(frame, corner_ids)
-        
-        if not has_homography and warper.homography_matrix is None:
-            print(f"Frame {frame_idx}: Could not find corners and no previous homography. Skipping.")
-            continue
-            
-        try:
-            warped = warper.warp(frame)
-        except Exception as e:
-            print(f"Frame {frame_idx}: Warp failed {e}")
-            continue
-            
-        # 3.2 Detect Tags on Warped Board (or Original and warp points? Better to detect on Original usually)
-        # We detect on original frame for better resolution/quality, then warp centers.
-        tags = detector.detect(frame)
-        
-        # Warp tag centers
-        if tags:
-            tag_centers = np.array([t.center for t in tags])
-            warped_centers = warper.warp_points(tag_centers)
-        else:
-            warped_centers = []
-            
-        # 3.3 Map to Squares
-        square_tag_map = {} # "e4" -> tag_id
-        
-        debug_img = warped.copy()
-        
-        for i, tag in enumerate(tags):
-            wx, wy = warped_centers[i]
-            sq = mapper.point_to_square(wx, wy)
-            
-            if sq:
-                # Resolve conflict? If multiple tags on same square?
-                # Take the one closest to center?
-                # For now just overwrite (or could check confidence)
-                square_tag_map[sq] = tag.tag_id
-                
-                # Draw for debug
-                cv2.circle(debug_img, (int(wx), int(wy)), 5, (0, 255, 0), -1)
-                cv2.putText(debug_img, f"{tag.tag_id}:{sq}", (int(wx), int(wy)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-        
-        cv2.imwrite(os.path.join(debug_dir, f"frame_{frame_idx}_warped.jpg"), debug_img)
-        
-        # 3.4 Create State
-        curr_state = state_mgr.create_state(square_tag_map, sf.timestamp, frame_idx)
-        
-        # 3.5 Infer Move
-        if prev_state:
-            # Check if state changed significantly?
-            # Ideally we only infer move if something changed.
-            # But we might have multiple stable frames for the same position.
-            # We need to detect *change* of state.
-            
-            # Simple diff:
-            if curr_state.placement != prev_state.placement:
-                move = move_inf.infer_move(prev_state, curr_state)
-                if move:
-                    print(f" inferred move: {move} at {sf.timestamp:.2f}s")
-                else:
-                    print(f" state changed but no valid move found at {sf.timestamp:.2f}s")
-            else:
-                # No change
-                pass
-        
-        prev_state = curr_state
-        
-    # 4. Output PGN
-    pgn_path = os.path.join(outdir, "game.pgn")
-    with open(pgn_path, "w") as f:
-        f.write(move_inf.get_pgn())
-    print(f"PGN saved to {pgn_path}")
-    
-    # 5. Stockfish Analysis (MVP-3)
-    from otbtagreview.pipeline.engine import EngineAnalyzer
-    from otbtagreview.pipeline.review import ReviewGenerator
-    
-    # Initialize engine
-    engine = EngineAnalyzer(depth=engine_depth)
-    engine.start()
-    
-    # Analyze the game from PGN
-    # Reload game from PGN to be sure we have clean history
-    import chess.pgn
-    import io
-    
-    pgn_str = move_inf.get_pgn()
-    pgn_io = io.StringIO(pgn_str)
-    game = chess.pgn.read_game(pgn_io)
-    
-    analyzed_moves = []
-    
-    if game and engine.engine:
-        board = game.board()
-        prev_eval = None
-        
-        review_gen = ReviewGenerator()
-        
-        print("Running Stockfish analysis...")
-        
-        # Analyze initial position? Usually not needed unless custom start.
-        
-        move_idx = 0
-        for node in game.mainline():
-            move = node.move
-            board.push(move)
-            
-            # Analyze position after move
-            eval_result = engine.analyze(board, pv_len=pv_len)
-            
-            # Classify
-            curr_cp = eval_result.get("score_cp")
-            classification = review_gen.classify_move(prev_eval, curr_cp, move_idx)
-            
-            analyzed_moves.append({
-                "san": node.san(),
-                "uci": move.uci(),
-                "fen": board.fen(),
-                "eval": eval_result,
-                "classification": classification
-            })
-            
-            prev_eval = curr_cp
-            move_idx += 1
-            print(f" Analyzed move {move_idx}: {node.san()} ({classification})")
-            
-    engine.stop()
-
-    # 6. Generate Web Assets
-    analysis = {
-        "moves": analyzed_moves,
-        "game_info": game.headers if game else {}
-    }
-    
-    # Write JSON for reference
-    with open(os.path.join(outdir, "analysis.json"), "w") as f:
-        json.dump(analysis, f, indent=2)
-        
-    # Write JS for local file access (avoid CORS)
-    with open(os.path.join(outdir, "data.js"), "w") as f:
-        f.write("window.GAME_DATA = " + json.dumps(analysis, indent=2) + ";")
-        
-    # Copy web assets
-    import shutil
-    # Assuming web assets are relative to package
-    # For now, just copy the index.html we wrote
-    # But ideally we should package it.
-    # Since we are running from source or installed package...
-    # Let's write the index.html content directly or copy if it exists in source
-    
-    # For now, we manually wrote index.html in the previous step to source.
-    # We should copy it to outdir.
-    src_web = os.path.join(os.path.dirname(__file__), 'web', 'index.html')
-    if os.path.exists(src_web):
-        shutil.copy(src_web, os.path.join(outdir, 'index.html'))
+    print(f"Analyzing {len(configs)} boards: {', '.join(c.name for c in configs)}")
+    run_boards(input_path, configs, detector_profile, detect_pyramid_level, drift_check_every, drift_tolerance, engine_settings)
+
+@main.command()
+@click.option('--outdir', required=True, help='Output directory of an earlier analyze run')
+@click.option('--ply', required=True, type=int, help="Ply of the wrong move (1 = White's first move)")
+@click.option('--start', 'start_s', type=float, default=None, help='Start of the segment to re-run, in seconds (default: just after the previous move)')
+@click.option('--end', 'end_s', type=float, default=None, help='End of the segment, in seconds (default: just before the next move)')
+@click.option('--input', 'input_path', default=None, help='Path to video file (default: the one the run analyzed)')
+@click.option('--motion_threshold', type=float, default=None, help='Motion threshold for the segment (default: as in the run)')
+@click.option('--stable_duration', type=float, default=None, help='Seconds a position must hold to count as stable (default: as in the run)')
+@click.option('--detector_profile', default=None, help='Detector profile for the segment (default: as in the run)')
+@click.option('--detect_pyramid_level', type=int, default=None, help='Pyramid level for the segment (default: as in the run)')
+def fix(outdir, ply, start_s, end_s, input_path, motion_threshold, stable_duration, detector_profile, detect_pyramid_level):
+    """
+    Correct one move: re-detect a short segment of the video, replay move
+    inference from the stored position before it and patch the PGN and
+    engine analysis from there on.
+    """
+    try:
+        manifest = RunManifest.load(output_path(outdir, MANIFEST_FILE))
+        index = VideoIndex.load(output_path(outdir, VIDEO_INDEX_FILE))
+        with open(output_path(outdir, STATES_FILE), 'r') as f:
+            stored = json.load(f)
+    except FileNotFoundError as e:
+        raise click.ClickException(f"{e.filename} not found; run analyze with this version first")
+    states = [BoardState.from_dict(s) for s in stored["states"]]
+    moves = stored["moves"]
+
+    old_analysis = []
+    if os.path.exists(output_path(outdir, ANALYSIS_FILE)):
+        with open(output_path(outdir, ANALYSIS_FILE), 'r') as f:
+            old_analysis = json.load(f)["moves"]
+
+    # A ply one past the end recovers a final move that was missed
+    if not 1 <= ply <= len(moves) + 1:
+        raise click.BadParameter(f"the game has {len(moves)} plies", param_hint='--ply')
+
+    # Default segment: between the states the neighbouring moves were inferred at
+    fps = index.fps
+    last_frame = index.frame_count - 1
+    if start_s is not None:
+        start_frame = max(0, int(round(start_s * fps)))
+    else:
+        start_frame = moves[ply - 2]["frame_idx"] + 1 if ply > 1 else 0
+    if end_s is not None:
+        end_frame = min(last_frame, int(round(end_s * fps)))
     else:
-        print("Warning: index.html template not found!")
+        end_frame = moves[ply]["frame_idx"] - 1 if ply < len(moves) else last_frame
+    if ply <= len(moves) and start_frame > moves[ply - 1]["frame_idx"]:
+        raise click.BadParameter(f"ply {ply} was inferred at {moves[ply - 1]['timestamp']:.2f}s, "
+                                 f"the segment must start before that", param_hint='--start')
+    if end_frame < start_frame:
+        raise click.BadParameter("the segment is empty", param_hint='--end')
+
+    # Everything before the segment is kept as stored
+    before = [s for s in states if s.frame_idx < start_frame]
+    after = [s for s in states if s.frame_idx > end_frame]
+    kept_moves = [m for m in moves if m["frame_idx"] < start_frame]
+
+    # Engine results for the kept moves stay valid as long as they match
+    analyzed = 0
+    while (analyzed < len(kept_moves) and analyzed < len(old_analysis)
+           and old_analysis[analyzed]["uci"] == kept_moves[analyzed]["uci"]):
+        analyzed += 1
+
+    print(f"Re-running {start_frame / fps:.2f}s - {end_frame / fps:.2f}s "
+          f"from ply {len(kept_moves)}, {len(after)} stored states after it")
+
+    video_proc = VideoProcessor(
+        input_path or manifest.input_path,
+        motion_threshold=manifest.motion_threshold if motion_threshold is None else motion_threshold,
+        stable_duration=manifest.stable_duration if stable_duration is None else stable_duration
+    )
+    cache = AnalysisCache.from_analysis(old_analysis)
+    worker = make_worker(manifest.engine_settings, history=old_analysis[:analyzed], cache=cache)
+    config = BoardConfig(
+        name=manifest.board_name,
+        corner_ids=manifest.corner_ids,
+        piece_map=manifest.piece_map,
+        outdir=outdir,
+        calibration=Calibration.from_dict(manifest.calibration) if manifest.calibration else None
+    )
+    detector_params = detector_profile_params(detector_profile) if detector_profile else manifest.detector_params
+    try:
+        session = BoardSession(config, worker, manifest.drift_check_every, manifest.drift_tolerance,
+                               frame_size=video_proc.frame_size, detector_params=detector_params)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    worker.start()
+    session.resume(before, kept_moves, analyzed)
+
+    if detect_pyramid_level is None:
+        detect_pyramid_level = manifest.detect_pyramid_level
+    detector = TagDetector(params=detector_params, pyramid_level=detect_pyramid_level)
+    video_proc.seek(start_frame, index)
+
+    stable_count = 0
+    for sf, names in video_proc.get_stable_frames_by_region({config.name: manifest.motion_roi}, end_frame=end_frame):
+        stable_count += 1
+        tags = detector.detect(sf.frame, roi=session.detect_roi)
+        session.process(sf.frame, sf.frame_idx, sf.timestamp, tags)
+    video_proc.release()
+    print(f"Found {stable_count} stable frames in the segment.")
+
+    # The rest of the game comes from the stored states
+    session.replay_states(after)
+
+    old_line = [m["san"] for m in moves]
+    new_line = [m["san"] for m in session.moves]
+    changed = next((i for i, (a, b) in enumerate(zip(old_line, new_line)) if a != b), min(len(old_line), len(new_line)))
+    if old_line == new_line:
+        print("No moves changed.")
+    else:
+        print(f"Ply {changed + 1} onwards: {' '.join(old_line[changed:changed + 3]) or '-'} -> "
+              f"{' '.join(new_line[changed:changed + 3]) or '-'} ({len(old_line)} -> {len(new_line)} plies)")
+
+    session.finish()
+    if cache.hits:
+        print(f"Reused {cache.hits} engine results from the previous analysis.")
+
+@main.command('engine-serve')
+@click.option('--socket', 'socket_path', default=DEFAULT_ENGINE_SOCKET, help='UNIX socket to listen on')
+@click.option('--instances', default=DEFAULT_ENGINE_INSTANCES, help='Number of warm Stockfish instances')
+@click.option('--engine_path', default='stockfish', help='Path to the Stockfish (UCI) binary')
+@click.option('--engine_threads', default=0, help='Threads per instance (0 = auto, cores split between instances)')
+@click.option('--engine_hash', default=0, help='Hash per instance in MB (0 = auto, split between instances)')
+def engine_serve(socket_path, instances, engine_path, engine_threads, engine_hash):
+    """
+    Run a local engine service that keeps Stockfish instances warm across
+    analyze runs.
+    """
+    service = EngineService(
+        socket_path,
+        engine_path=engine_path,
+        instances=instances,
+        threads=engine_threads or max(1, auto_engine_threads() // instances),
+        hash_mb=engine_hash or max(16, auto_engine_hash_mb() // instances)
+    )
+    # Shut down cleanly (quit engines, remove the socket) on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        service.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        print("Engine service stopped.")
+
+@main.command('engine-status')
+@click.option('--socket', 'socket_path', default=DEFAULT_ENGINE_SOCKET, help='UNIX socket of the engine service')
+def engine_status(socket_path):
+    """
+    Show queue depth and request latency of the engine service.
+    """
+    client = EngineClient(socket_path, timeout=5.0)
+    if not client.connect():
+        print(f"No engine service running at {socket_path}")
+        return
+    stats = client.stats()
+    client.quit()
+    print(f"Instances: {stats['instances']} of {stats['configured_instances']} ({stats['busy']} busy)")
+    print(f"Queue depth: {stats['queue_depth']}")
+    print(f"Requests served: {stats['requests']}")
+    if "latency_ms" in stats:
+        lat = stats["latency_ms"]
+        print(f"Latency (ms): mean {lat['mean']}, p50 {lat['p50']}, p95 {lat['p95']}, max {lat['max']}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+# Search limit types understood by EngineAnalyzer
+ENGINE_LIMITS = ("depth", "movetime", "nodes")
+
+DEFAULT_ENGINE_DEPTH = 16
+DEFAULT_ENGINE_MOVETIME_MS = 1000
+DEFAULT_ENGINE_NODES = 1_000_000
+
+# UNIX socket of the shared engine service (engine-serve). EngineAnalyzer
+# uses it when it is running and spawns its own Stockfish otherwise.
+DEFAULT_ENGINE_SOCKET = os.environ.get(
+    "OTBTAGREVIEW_ENGINE_SOCKET",
+    os.path.join(tempfile.gettempdir(), "otbtagreview-engine.sock")
+)
+DEFAULT_ENGINE_INSTANCES = 2
+# Seconds an analyze run waits for one engine service reply (queueing
+# included) before it gives up on the service and spawns its own Stockfish
+ENGINE_SERVICE_TIMEOUT_S = 120.0
+
+# Bounds for the auto-sized Stockfish hash table (MB)
+MIN_ENGINE_HASH_MB = 16
+MAX_ENGINE_HASH_MB = 1024
+
+
+def auto_engine_threads() -> int:
+    """
+    Give Stockfish every core but one, so video decoding keeps a core to itself.
+    """
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def auto_engine_hash_mb() -> int:
+    """
+    Size the hash table to roughly 1/16 of physical memory, rounded down to a
+    power of two and clamped to [MIN_ENGINE_HASH_MB, MAX_ENGINE_HASH_MB].
+    """
+    try:
+        total_mb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        # Not available on this platform (e.g. Windows)
+        return 256
+
+    target = max(MIN_ENGINE_HASH_MB, min(MAX_ENGINE_HASH_MB, total_mb // 16))
+    hash_mb = MIN_ENGINE_HASH_MB
+    while hash_mb * 2 <= target:
+        hash_mb *= 2
+    return hash_mb
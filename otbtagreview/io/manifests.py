@@ -0,0 +1,44 @@
+import json
+from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Any, Tuple
+
+
+@dataclass
+class RunManifest:
+    """
+    Everything needed to re-run part of an analyze run for one board: the
+    video, the board definition and the detection and engine settings used.
+    Saved as run.json next to the run's other outputs.
+    """
+    input_path: str
+    board_name: str
+    corner_ids: List[int]
+    piece_map: Dict[str, str]
+    calibration: Optional[Dict[str, Any]]
+    # Profile as given on the command line and the overrides it resolved to
+    detector_profile: str
+    detector_params: Dict[str, Any]
+    detect_pyramid_level: int
+    drift_check_every: int
+    drift_tolerance: float
+    motion_threshold: float
+    stable_duration: float
+    # Region judged for motion (multi-board runs only; None = whole frame)
+    motion_roi: Optional[Tuple[int, int, int, int]]
+    engine_settings: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunManifest":
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
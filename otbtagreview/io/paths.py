@@ -0,0 +1,14 @@
+import os
+
+# Files written to a run's output directory
+PGN_FILE = "game.pgn"
+ANALYSIS_FILE = "analysis.json"
+PAGE_FILE = "index.html"
+STATES_FILE = "states.json"
+MANIFEST_FILE = "run.json"
+VIDEO_INDEX_FILE = "video_index.json"
+DEBUG_DIR = "debug"
+
+
+def output_path(outdir: str, name: str) -> str:
+    return os.path.join(outdir, name)
@@ -1,11 +1,63 @@
 import cv2
 import numpy as np
-from typing import Optional, List, Tuple
+import json
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Tuple, Dict, Any
+from .tags import build_detector_parameters, DetectedTag
+
+# Padding around the board when cropping to its ROI, as a fraction of the board extent
+ROI_MARGIN = 0.1
+
+@dataclass
+class Calibration:
+    """
+    Persisted board calibration for a fixed camera mount.
+    """
+    homography: List[List[float]]
+    output_size: int
+    corner_ids: List[int]
+    # Corner marker centers in the source frame, used for drift checks
+    corner_centers: List[List[float]]
+    # Board region in the source frame: x, y, w, h
+    roi: List[int]
+    white_at_bottom: bool
+    frame_size: List[int]
+    
+    def to_dict(self):
+        return asdict(self)
+        
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Calibration":
+        return cls(**data)
+        
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            
+    @classmethod
+    def load(cls, path: str) -> "Calibration":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
 
 class BoardWarper:
-    def __init__(self, output_size: int = 900):
+    def __init__(self, output_size: int = 900, detector_params: Optional[Dict[str, Any]] = None):
+        """
+        detector_params: DetectorParameters overrides, see tags.resolve_detector_profile().
+        """
         self.output_size = output_size
         self.homography_matrix = None
+        # Corner marker centers (source frame) the homography was computed from
+        self.corner_ids: List[int] = []
+        self.corner_centers: Optional[np.ndarray] = None
+        self.detector_params = detector_params
+        self._detectors = {}
+
+    def _get_detector(self, aruco_dict_type):
+        if aruco_dict_type not in self._detectors:
+            aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dict_type)
+            parameters = build_detector_parameters(self.detector_params)
+            self._detectors[aruco_dict_type] = cv2.aruco.ArucoDetector(aruco_dict, parameters)
+        return self._detectors[aruco_dict_type]
         
     def find_corners_and_compute_homography(self, frame: np.ndarray, corner_ids: List[int], aruco_dict_type=cv2.aruco.DICT_4X4_50) -> bool:
         """
@@ -13,9 +65,7 @@ class BoardWarper:
         Assumes corner_ids are ordered: [TopLeft, TopRight, BottomRight, BottomLeft]
         """
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        aruco_dict = cv2.aruco.getPredefinedDictionary(aruco_dict_type)
-        parameters = cv2.aruco.DetectorParameters()
-        detector = cv2.aruco.ArucoDetector(aruco_dict, parameters)
+        detector = self._get_detector(aruco_dict_type)
         
         corners, ids, rejected = detector.detectMarkers(gray)
         
@@ -32,6 +82,17 @@ class BoardWarper:
                 center = np.mean(c, axis=0)
                 found_corners[marker_id] = center
                 
+        return self.compute_homography_from_centers(found_corners, corner_ids)
+        
+    def compute_homography_from_tags(self, tags: List[DetectedTag], corner_ids: List[int]) -> bool:
+        """
+        Same as find_corners_and_compute_homography, but reuses tags that
+        were already detected on the frame instead of running detection again.
+        """
+        found_corners = {t.tag_id: np.array(t.center, dtype=np.float32) for t in tags if t.tag_id in corner_ids}
+        return self.compute_homography_from_centers(found_corners, corner_ids)
+        
+    def compute_homography_from_centers(self, found_corners: Dict[int, np.ndarray], corner_ids: List[int]) -> bool:
         if len(found_corners) != 4:
             return False
             
@@ -54,8 +115,70 @@ class BoardWarper:
         ], dtype=np.float32)
         
         self.homography_matrix, _ = cv2.findHomography(src_points, dst_points)
+        self.corner_ids = list(corner_ids)
+        self.corner_centers = src_points
         return True
         
+    def board_roi(self, frame_shape: Tuple[int, ...], margin: float = ROI_MARGIN) -> Tuple[int, int, int, int]:
+        """
+        Bounding box (x, y, w, h) of the board in the source frame, grown by
+        `margin` (fraction of the board extent) so corner markers and tags
+        on tall pieces stay inside. Clipped to the frame.
+        """
+        if self.homography_matrix is None:
+            raise ValueError("Homography matrix not computed")
+        s = self.output_size
+        board_corners = np.array([[0, 0], [s, 0], [s, s], [0, s]], dtype=np.float32).reshape(-1, 1, 2)
+        src = cv2.perspectiveTransform(board_corners, np.linalg.inv(self.homography_matrix)).reshape(-1, 2)
+        
+        x0, y0 = src.min(axis=0)
+        x1, y1 = src.max(axis=0)
+        pad_x = (x1 - x0) * margin
+        pad_y = (y1 - y0) * margin
+        
+        h, w = frame_shape[:2]
+        x0 = int(max(0, np.floor(x0 - pad_x)))
+        y0 = int(max(0, np.floor(y0 - pad_y)))
+        x1 = int(min(w, np.ceil(x1 + pad_x)))
+        y1 = int(min(h, np.ceil(y1 + pad_y)))
+        return (x0, y0, x1 - x0, y1 - y0)
+        
+    def check_drift(self, tags: List[DetectedTag]) -> Optional[float]:
+        """
+        Largest distance (source pixels) between a visible corner marker and
+        where it was when the homography was computed. None if no corner
+        marker is visible among `tags`.
+        """
+        if self.corner_centers is None:
+            return None
+        drift = None
+        for t in tags:
+            if t.tag_id in self.corner_ids:
+                ref = self.corner_centers[self.corner_ids.index(t.tag_id)]
+                d = float(np.hypot(t.center[0] - ref[0], t.center[1] - ref[1]))
+                drift = d if drift is None else max(drift, d)
+        return drift
+        
+    def to_calibration(self, frame_shape: Tuple[int, ...], white_at_bottom: bool = True) -> "Calibration":
+        if self.homography_matrix is None:
+            raise ValueError("Homography matrix not computed")
+        h, w = frame_shape[:2]
+        return Calibration(
+            homography=self.homography_matrix.tolist(),
+            output_size=self.output_size,
+            corner_ids=list(self.corner_ids),
+            corner_centers=self.corner_centers.tolist(),
+            roi=list(self.board_roi(frame_shape)),
+            white_at_bottom=white_at_bottom,
+            frame_size=[w, h]
+        )
+        
+    def apply_calibration(self, cal: "Calibration"):
+        self.output_size = cal.output_size
+        self.homography_matrix = np.array(cal.homography, dtype=np.float64)
+        self.corner_ids = list(cal.corner_ids)
+        self.corner_centers = np.array(cal.corner_centers, dtype=np.float32)
+        
     def warp(self, frame: np.ndarray) -> np.ndarray:
         if self.homography_matrix is None:
             raise ValueError("Homography matrix not computed")
@@ -0,0 +1,36 @@
+import chess
+import chess.polyglot
+from typing import Optional
+
+class OpeningBook:
+    def __init__(self, book_path: Optional[str] = None):
+        """
+        book_path: local Polyglot .bin file. None disables the book.
+        """
+        self.book_path = book_path
+        self.reader = None
+
+    def start(self):
+        if not self.book_path:
+            return
+        try:
+            self.reader = chess.polyglot.open_reader(self.book_path)
+        except (FileNotFoundError, OSError):
+            print(f"Warning: opening book not found at {self.book_path}. Book moves will be analyzed.")
+            self.reader = None
+
+    def stop(self):
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
+    def is_book_move(self, board: chess.Board, move: chess.Move) -> bool:
+        """
+        True if the book has `move` as a continuation of `board` (before the move).
+        """
+        if not self.reader:
+            return False
+        for entry in self.reader.find_all(board):
+            if entry.move == move:
+                return True
+        return False
@@ -0,0 +1,31 @@
+import chess
+from typing import List, Dict, Optional, Any
+
+
+class AnalysisCache:
+    """
+    Engine results from an earlier run, keyed by position (FEN). Only valid
+    for the engine settings that produced them. Read-only: new searches
+    reach the next run through analysis.json.
+    """
+    def __init__(self):
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+
+    @classmethod
+    def from_analysis(cls, analyzed_moves: List[Dict[str, Any]]) -> "AnalysisCache":
+        """
+        analyzed_moves: the "moves" list of an analysis.json.
+        """
+        cache = cls()
+        for entry in analyzed_moves:
+            # Book moves carry no engine result
+            if entry.get("eval"):
+                cache.entries[entry["fen"]] = entry["eval"]
+        return cache
+
+    def get(self, board: chess.Board) -> Optional[Dict[str, Any]]:
+        result = self.entries.get(board.fen())
+        if result is not None:
+            self.hits += 1
+        return result
@@ -1,61 +1,286 @@
 import chess
 import chess.engine
 import os
+import queue
+import threading
 from typing import List, Dict, Optional, Any
+from otbtagreview.config import (
+    ENGINE_LIMITS,
+    DEFAULT_ENGINE_DEPTH,
+    DEFAULT_ENGINE_MOVETIME_MS,
+    DEFAULT_ENGINE_NODES,
+    ENGINE_SERVICE_TIMEOUT_S,
+    auto_engine_threads,
+    auto_engine_hash_mb,
+)
+from .book import OpeningBook
+from .cache import AnalysisCache
+from .engine_service import EngineClient
+from .review import ReviewGenerator
 
 class EngineAnalyzer:
-    def __init__(self, engine_path: str = "stockfish", depth: int = 16, threads: int = 2):
+    def __init__(self, engine_path: str = "stockfish", depth: int = DEFAULT_ENGINE_DEPTH,
+                 threads: Optional[int] = None, hash_mb: Optional[int] = None,
+                 limit: str = "depth", movetime_ms: int = DEFAULT_ENGINE_MOVETIME_MS,
+                 nodes: int = DEFAULT_ENGINE_NODES, multipv: int = 1, pv_len: int = 0,
+                 service_socket: Optional[str] = None):
+        """
+        limit: which search limit to use ("depth", "movetime" or "nodes").
+        threads/hash_mb: None (or 0) sizes them to the machine.
+        multipv: number of lines Stockfish searches; only the first drives the review.
+        pv_len: plies of each principal variation to keep (0 = full line).
+        service_socket: engine service (engine-serve) to use when it is
+        running; otherwise, or if the service fails mid-run, a local
+        Stockfish is spawned.
+        """
+        if limit not in ENGINE_LIMITS:
+            raise ValueError(f"Unknown engine limit: {limit} (expected one of {', '.join(ENGINE_LIMITS)})")
         self.engine_path = engine_path
         self.depth = depth
-        self.threads = threads
+        self.threads = threads or auto_engine_threads()
+        self.hash_mb = hash_mb or auto_engine_hash_mb()
+        self.limit = limit
+        self.movetime_ms = movetime_ms
+        self.nodes = nodes
+        self.multipv = max(1, multipv)
+        self.pv_len = pv_len
+        self.service_socket = service_socket
         self.engine = None
-        
+
     def start(self):
+        if self.service_socket:
+            client = EngineClient(self.service_socket, timeout=ENGINE_SERVICE_TIMEOUT_S)
+            if client.connect():
+                # Warm instances are configured by the service itself
+                self.engine = client
+                print(f"Engine: {self.describe_limit()}, multipv={self.multipv}, service at {self.service_socket}")
+                return
+        self._start_local()
+
+    def _start_local(self):
         try:
             self.engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
-            self.engine.configure({"Threads": self.threads})
         except FileNotFoundError:
             print(f"Warning: Stockfish engine not found at {self.engine_path}. Analysis will be skipped.")
             self.engine = None
-            
+            return
+
+        options = {}
+        if "Threads" in self.engine.options:
+            options["Threads"] = self._clamp_option("Threads", self.threads)
+        if "Hash" in self.engine.options:
+            options["Hash"] = self._clamp_option("Hash", self.hash_mb)
+        self.engine.configure(options)
+        print(f"Engine: {self.describe_limit()}, multipv={self.multipv}, "
+              f"threads={options.get('Threads', '-')}, hash={options.get('Hash', '-')}MB")
+
+    def _clamp_option(self, name: str, value: int) -> int:
+        opt = self.engine.options[name]
+        if opt.min is not None:
+            value = max(opt.min, value)
+        if opt.max is not None:
+            value = min(opt.max, value)
+        return value
+
     def stop(self):
         if self.engine:
             self.engine.quit()
-            
-    def analyze(self, board: chess.Board, pv_len: int = 1) -> Dict[str, Any]:
+
+    def search_limit(self) -> chess.engine.Limit:
+        if self.limit == "movetime":
+            return chess.engine.Limit(time=self.movetime_ms / 1000.0)
+        if self.limit == "nodes":
+            return chess.engine.Limit(nodes=self.nodes)
+        return chess.engine.Limit(depth=self.depth)
+
+    def describe_limit(self) -> str:
+        if self.limit == "movetime":
+            return f"movetime {self.movetime_ms}ms"
+        if self.limit == "nodes":
+            return f"nodes {self.nodes}"
+        return f"depth {self.depth}"
+
+    def analyze(self, board: chess.Board, pv_len: Optional[int] = None) -> Dict[str, Any]:
         if not self.engine:
             return {}
-            
-        info = self.engine.analyse(board, chess.engine.Limit(depth=self.depth), multipv=pv_len)
-        
+
+        if pv_len is None:
+            pv_len = self.pv_len
+
+        try:
+            info = self.engine.analyse(board, self.search_limit(), multipv=self.multipv)
+        except (chess.engine.EngineError, OSError) as e:
+            if not isinstance(self.engine, EngineClient):
+                raise
+            # Service died, hung or failed: finish the run on a local engine
+            print(f"Warning: engine service failed ({e!r}), starting a local Stockfish")
+            self.engine.quit()
+            self._start_local()
+            if not self.engine:
+                return {}
+            info = self.engine.analyse(board, self.search_limit(), multipv=self.multipv)
+
         # Format result
-        # Note: info is a list if multipv > 1, but we usually take the best line
+        # Note: info is a list if multipv is given, but the review uses the best line
         if isinstance(info, list):
-            best_info = info[0]
+            lines = info
         else:
-            best_info = info
-            
-        score = best_info["score"].white() # Always from white's perspective for graph?
+            lines = [info]
+
+        result = self._format_line(board, lines[0], pv_len)
+        if self.multipv > 1:
+            result["lines"] = [self._format_line(board, line, pv_len) for line in lines]
+        return result
+
+    def _format_line(self, board: chess.Board, info: Dict[str, Any], pv_len: int) -> Dict[str, Any]:
+        score = info["score"].white() # Always from white's perspective for graph?
         # Or usually cp is relative to side to move.
         # Let's store both or standardized.
         # python-chess score.white() gives score from white's POV.
-        
+
         mate = score.mate()
         cp = score.score()
-        
-        pv_moves = best_info.get("pv", [])
+
+        pv_moves = info.get("pv", [])
         pv_san = []
-        
+
         # We need a temp board to generate SAN for PV
         temp_board = board.copy()
-        for move in pv_moves:
+        for move in pv_moves[:pv_len] if pv_len > 0 else pv_moves:
             pv_san.append(temp_board.san(move))
             temp_board.push(move)
-            
+
         return {
             "score_cp": cp,
             "score_mate": mate,
-            "depth": best_info.get("depth", 0),
+            "depth": info.get("depth", 0),
             "pv": pv_san,
             "best_move": pv_moves[0].uci() if pv_moves else None
         }
+
+
+class AnalysisWorker:
+    """
+    Analyzes moves on a background thread while the video is still being
+    processed, so the engine runs during the vision phase instead of after it.
+    Moves must be submitted in game order; a single worker consumes them
+    FIFO, which keeps book tracking and classification sequential.
+    """
+    def __init__(self, engine: EngineAnalyzer, book: Optional[OpeningBook] = None,
+                 review_gen: Optional[ReviewGenerator] = None,
+                 history: Optional[List[Dict[str, Any]]] = None,
+                 cache: Optional[AnalysisCache] = None):
+        """
+        history: analyzed moves of an earlier run to continue from; submitted
+        moves follow on from its last ply.
+        cache: engine results to reuse instead of searching again.
+        """
+        self.engine = engine
+        self.book = book or OpeningBook()
+        self.review_gen = review_gen or ReviewGenerator()
+        self.cache = cache
+        self.queue: "queue.Queue" = queue.Queue()
+        self.results: List[Dict[str, Any]] = list(history or [])
+        # Unexpected error that stopped the worker thread, raised by finish()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.engine.start()
+        self.book.start()
+        self.thread.start()
+
+    def submit(self, board_before: chess.Board, move: chess.Move):
+        """
+        board_before: position the move was played from (copied here).
+        """
+        self.queue.put((board_before.copy(), move))
+
+    def pending(self) -> int:
+        return self.queue.qsize()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """
+        Wait for every submitted move, stop the engine and return the
+        analyzed moves in ply order.
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.engine.stop()
+        self.book.stop()
+        if self.error:
+            raise RuntimeError(f"Analysis stopped after {len(self.results)} moves") from self.error
+        return self.results
+
+    def _analyze(self, board: chess.Board) -> Dict[str, Any]:
+        if self.cache:
+            cached = self.cache.get(board)
+            if cached is not None:
+                return cached
+        try:
+            return self.engine.analyze(board)
+        except (chess.engine.EngineError, OSError, TimeoutError) as e:
+            # One failed search must not cost the rest of the game
+            print(f"Warning: engine analysis failed for {board.fen()}: {e!r}")
+            return {}
+
+    def _run(self):
+        try:
+            self._consume()
+        except Exception as e:
+            self.error = e
+
+    def _consume(self):
+        prev_eval = None
+        in_book = self.book.reader is not None
+        move_idx = len(self.results)
+        if self.results:
+            last = self.results[-1]
+            prev_eval = self.review_gen.eval_cp(last["eval"], last["fen"])
+            in_book = in_book and last["classification"] == "Book"
+        # Decided once: an engine lost mid-run still records every move
+        has_engine = self.engine.engine is not None
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if not has_engine:
+                # No engine: drain the queue, nothing to analyze
+                continue
+
+            board, move = item
+            san = board.san(move)
+
+            # Stay in book until the first move the book doesn't know
+            if in_book and not self.book.is_book_move(board, move):
+                in_book = False
+            if not in_book and prev_eval is None:
+                # Baseline for the first engine-classified move (ply 1
+                # included) or the move after a failed search
+                prev_eval = self.review_gen.eval_cp(self._analyze(board), board.fen())
+
+            board.push(move)
+
+            if in_book:
+                eval_result = {}
+                curr_cp = None
+            else:
+                # Analyze position after move
+                eval_result = self._analyze(board)
+                curr_cp = self.review_gen.eval_cp(eval_result, board.fen())
+
+            # Classify
+            classification = self.review_gen.classify_move(prev_eval, curr_cp, move_idx, in_book=in_book)
+
+            self.results.append({
+                "san": san,
+                "uci": move.uci(),
+                "fen": board.fen(),
+                "eval": eval_result,
+                "classification": classification
+            })
+
+            prev_eval = curr_cp
+            move_idx += 1
+            print(f" Analyzed move {move_idx}: {san} ({classification})")
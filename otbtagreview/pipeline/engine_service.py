@@ -0,0 +1,304 @@
+import chess
+import chess.engine
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from typing import List, Dict, Optional, Any
+
+# Latencies kept for the stats report
+LATENCY_WINDOW = 1000
+# How often a request waiting for a free instance checks that any are left
+POOL_POLL_S = 1.0
+
+
+def _limit_to_dict(limit: chess.engine.Limit) -> Dict[str, Any]:
+    out = {}
+    for key in ("depth", "time", "nodes"):
+        value = getattr(limit, key)
+        if value is not None:
+            out[key] = value
+    return out
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class EngineService:
+    """
+    Keeps a pool of warm Stockfish instances and serves analysis requests
+    over a UNIX domain socket, one JSON object per line in each direction.
+
+    Requests:
+      {"op": "analyse", "fen": <root fen>, "moves": [uci, ...],
+       "limit": {"depth": 16} | {"time": 1.0} | {"nodes": N}, "multipv": 1}
+      {"op": "stats"}
+    """
+    def __init__(self, socket_path: str, engine_path: str = "stockfish", instances: int = 2,
+                 threads: int = 1, hash_mb: int = 256):
+        self.socket_path = socket_path
+        self.engine_path = engine_path
+        self.instances = instances
+        self.threads = threads
+        self.hash_mb = hash_mb
+
+        self.pool: "queue.Queue" = queue.Queue()
+        self.engines = []
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.busy = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.server = None
+
+    def start_engines(self):
+        for _ in range(self.instances):
+            engine = self._start_engine()
+            self.engines.append(engine)
+            self.pool.put(engine)
+
+    def _start_engine(self) -> chess.engine.SimpleEngine:
+        engine = chess.engine.SimpleEngine.popen_uci(self.engine_path)
+        options = {}
+        if "Threads" in engine.options:
+            options["Threads"] = self.threads
+        if "Hash" in engine.options:
+            options["Hash"] = self.hash_mb
+        engine.configure(options)
+        return engine
+
+    def _replace_engine(self, dead: chess.engine.SimpleEngine) -> Optional[chess.engine.SimpleEngine]:
+        """
+        Swap a crashed instance for a fresh one. Returns None if no new
+        instance could be started; the pool then has one instance fewer.
+        """
+        with self.lock:
+            if dead in self.engines:
+                self.engines.remove(dead)
+        try:
+            dead.quit()
+        except Exception:
+            pass
+        try:
+            engine = self._start_engine()
+        except (OSError, chess.engine.EngineError) as e:
+            print(f"Engine instance died and could not be restarted: {e!r}")
+            return None
+        with self.lock:
+            self.engines.append(engine)
+        print("Engine instance died, started a replacement")
+        return engine
+
+    def _take_engine(self) -> Optional[chess.engine.SimpleEngine]:
+        """Wait for a free instance. Returns None once every instance has died."""
+        while True:
+            with self.lock:
+                if not self.engines:
+                    return None
+            try:
+                return self.pool.get(timeout=POOL_POLL_S)
+            except queue.Empty:
+                continue
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            if EngineClient(self.socket_path).connect():
+                raise RuntimeError(f"An engine service is already running at {self.socket_path}")
+            # Stale socket from a service that did not shut down cleanly
+            os.unlink(self.socket_path)
+
+        self.start_engines()
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        response = service.handle_request(json.loads(line))
+                    except Exception as e:
+                        response = {"ok": False, "error": str(e)}
+                    self.wfile.write((json.dumps(response) + "\n").encode())
+                    self.wfile.flush()
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        print(f"Engine service: {self.instances} x {self.engine_path} "
+              f"(threads={self.threads}, hash={self.hash_mb}MB) on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        try:
+            if self.server:
+                self.server.server_close()
+                self.server = None
+            # One engine failing to quit must not keep the others running
+            for engine in self.engines:
+                try:
+                    engine.quit()
+                except Exception as e:
+                    print(f"Warning: engine did not quit cleanly: {e!r}")
+            self.engines = []
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "analyse":
+            return self.analyse(request)
+        if op == "stats":
+            return self.stats()
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def analyse(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        board = chess.Board(request.get("fen", chess.STARTING_FEN))
+        for uci in request.get("moves", []):
+            board.push_uci(uci)
+        limit = chess.engine.Limit(**request.get("limit", {"depth": 16}))
+        multipv = request.get("multipv", 1)
+
+        start = time.perf_counter()
+        with self.lock:
+            self.waiting += 1
+        engine = self._take_engine()
+        with self.lock:
+            self.waiting -= 1
+            if engine is None:
+                return {"ok": False, "error": "No engine instances left"}
+            self.busy += 1
+        wait_ms = (time.perf_counter() - start) * 1000.0
+
+        try:
+            infos = engine.analyse(board, limit, multipv=multipv)
+        except chess.engine.EngineTerminatedError:
+            # Don't hand a dead instance to the next request
+            engine = self._replace_engine(engine)
+            raise
+        finally:
+            if engine is not None:
+                self.pool.put(engine)
+            with self.lock:
+                self.busy -= 1
+
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency_ms)
+            queue_depth = self.waiting
+        print(f" request {self.requests}: {latency_ms:.0f} ms (waited {wait_ms:.0f} ms, queue {queue_depth})")
+
+        lines = []
+        for info in infos if isinstance(infos, list) else [infos]:
+            score = info["score"].white()
+            lines.append({
+                "cp": score.score(),
+                "mate": score.mate(),
+                "depth": info.get("depth", 0),
+                "pv": [m.uci() for m in info.get("pv", [])]
+            })
+        return {
+            "ok": True,
+            "lines": lines,
+            "latency_ms": round(latency_ms, 1),
+            "wait_ms": round(wait_ms, 1),
+            "queue_depth": queue_depth
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            latencies = list(self.latencies)
+            stats = {
+                "ok": True,
+                "instances": len(self.engines),
+                "configured_instances": self.instances,
+                "busy": self.busy,
+                "queue_depth": self.waiting,
+                "requests": self.requests,
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "mean": round(sum(latencies) / len(latencies), 1),
+                "p50": round(_percentile(latencies, 50), 1),
+                "p95": round(_percentile(latencies, 95), 1),
+                "max": round(max(latencies), 1),
+            }
+        return stats
+
+
+class EngineClient:
+    """
+    Connection to an EngineService. Offers the subset of SimpleEngine used
+    by EngineAnalyzer (analyse/quit), so it can stand in for a local engine.
+    """
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.sock = None
+        self.rfile = None
+
+    def connect(self) -> bool:
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(self.socket_path):
+            return False
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+        except OSError:
+            return False
+        self.sock = sock
+        self.rfile = sock.makefile("rb")
+        return True
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.sock.sendall((json.dumps(payload) + "\n").encode())
+        line = self.rfile.readline()
+        if not line:
+            raise chess.engine.EngineTerminatedError("Engine service closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise chess.engine.EngineError(response.get("error", "Engine service error"))
+        return response
+
+    def analyse(self, board: chess.Board, limit: chess.engine.Limit, multipv: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Send the game from its root so the service keeps one game (and a
+        # warm hash) instead of starting a new one per position
+        root = board.root()
+        response = self.request({
+            "op": "analyse",
+            "fen": root.fen(),
+            "moves": [m.uci() for m in board.move_stack],
+            "limit": _limit_to_dict(limit),
+            "multipv": multipv or 1
+        })
+
+        infos = []
+        for line in response["lines"]:
+            if line["mate"] is not None:
+                score = chess.engine.Mate(line["mate"])
+            else:
+                score = chess.engine.Cp(line["cp"])
+            infos.append({
+                "score": chess.engine.PovScore(score, chess.WHITE),
+                "depth": line["depth"],
+                "pv": [chess.Move.from_uci(m) for m in line["pv"]]
+            })
+        return infos
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request({"op": "stats"})
+
+    def quit(self):
+        if self.sock:
+            self.rfile.close()
+            self.sock.close()
+            self.sock = None
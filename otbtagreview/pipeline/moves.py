@@ -97,12 +97,18 @@ class MoveInferrer:
         # Let's trust the min discrepancy.
         
         if best_move:
-            self.board.push(best_move)
-            self.node = self.node.add_variation(best_move)
+            self.push(best_move)
             return best_move
             
         return None
         
+    def push(self, move: chess.Move):
+        """
+        Play a move on the board and append it to the game.
+        """
+        self.board.push(move)
+        self.node = self.node.add_variation(move)
+        
     def get_pgn(self) -> str:
         exporter = chess.pgn.StringExporter(headers=True, variations=True, comments=True)
         return self.game.accept(exporter)
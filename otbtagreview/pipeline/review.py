@@ -1,18 +1,31 @@
 import json
-from typing import List, Dict, Any
+import math
+import chess
+from typing import List, Dict, Any, Optional
+
+# Eval graph geometry (SVG user units) and the cp value mapped to its edges
+GRAPH_WIDTH = 600
+GRAPH_HEIGHT = 120
+GRAPH_CLAMP_CP = 1000
+# Centipawn value a mate is folded into for classification (nearer mates score higher)
+MATE_CP = 10000
 
 class ReviewGenerator:
     def __init__(self):
         pass
         
-    def classify_move(self, prev_eval: float, curr_eval: float, move_idx: int) -> str:
+    def classify_move(self, prev_eval: float, curr_eval: float, move_idx: int, in_book: bool = False) -> str:
         """
         Classify move based on evaluation drop.
         This is a simplified version.
         prev_eval/curr_eval are CP from White's perspective.
+        in_book: the move was found in the opening book (no evals needed).
         """
+        if in_book:
+            return "Book"
+            
         if prev_eval is None or curr_eval is None:
-            return "Book" # Or Unknown
+            return "Unknown"
             
         # Determine side to move (if move_idx is even, it was White's move)
         # move_idx 0 = White's first move
@@ -38,9 +51,148 @@ class ReviewGenerator:
         else:
             return "Best" # Or Normal
             
+    def eval_cp(self, ev: Dict[str, Any], fen: str) -> Optional[int]:
+        """
+        Centipawns from White's perspective for classify_move(): score_cp, or
+        a mate as +/-(MATE_CP - moves to mate). None if there is no eval.
+        """
+        if ev.get("score_cp") is not None:
+            return ev["score_cp"]
+        white_mates = self._white_mates(ev, fen)
+        if white_mates is None:
+            return None
+        value = MATE_CP - abs(ev["score_mate"])
+        return value if white_mates else -value
+        
     def generate_review(self, game_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         game_data: list of move info (san, fen, eval, etc.)
+        
+        Precomputes everything the review page draws, so the browser only
+        looks things up:
+        - plies[i]: position after i half-moves (plies[0] is the start), with
+          a 64-char board string (a8..h8, a7..h1, "." = empty), arrows as
+          [from, to, kind] square indices in the same order, eval text and
+          eval bar height.
+        - graph: SVG path and per-ply points of the eval graph.
         """
-        # TODO: Implement full review generation
-        return {}
+        plies = [{
+            "board": self._board_string(chess.STARTING_FEN),
+            "arrows": [],
+            "label": "Start",
+            "classification": "",
+            "eval_text": "",
+            "bar": 50.0,
+            "pv": []
+        }]
+        values = [0]
+        
+        for i, move in enumerate(game_data):
+            ev = move.get("eval") or {}
+            arrows = [self._arrow(move["uci"], "move")]
+            if ev.get("best_move"):
+                arrows.append(self._arrow(ev["best_move"], "best"))
+                
+            move_num = i // 2 + 1
+            label = f"{move_num}. {move['san']}" if i % 2 == 0 else f"{move_num}... {move['san']}"
+            white_mates = self._white_mates(ev, move["fen"])
+            value = self._graph_value(ev, white_mates, values[-1])
+            values.append(value)
+            
+            plies.append({
+                "board": self._board_string(move["fen"]),
+                "arrows": arrows,
+                "label": label,
+                "classification": move.get("classification") or "",
+                "eval_text": self._eval_text(ev, white_mates, move.get("classification")),
+                "bar": round(self._bar_percent(ev, white_mates), 1),
+                "pv": ev.get("pv", [])
+            })
+            
+        return {
+            "plies": plies,
+            "graph": self._graph(values)
+        }
+        
+    @staticmethod
+    def _board_string(fen: str) -> str:
+        board = chess.Board(fen)
+        cells = []
+        for rank in range(7, -1, -1):
+            for file in range(8):
+                piece = board.piece_at(chess.square(file, rank))
+                cells.append(piece.symbol() if piece else ".")
+        return "".join(cells)
+        
+    @staticmethod
+    def _arrow(uci: str, kind: str) -> List[Any]:
+        move = chess.Move.from_uci(uci)
+        
+        def index(sq: int) -> int:
+            return (7 - chess.square_rank(sq)) * 8 + chess.square_file(sq)
+            
+        return [index(move.from_square), index(move.to_square), kind]
+        
+    @staticmethod
+    def _white_mates(ev: Dict[str, Any], fen: str) -> Optional[bool]:
+        """
+        True/False if the eval is a mate for White/Black, None if it is not a mate.
+        """
+        mate = ev.get("score_mate")
+        if mate is None:
+            return None
+        if mate == 0:
+            # Checkmate on the board: the engine's "mate 0" has no sign,
+            # the side to move is the one mated
+            return chess.Board(fen).turn == chess.BLACK
+        return mate > 0
+        
+    @staticmethod
+    def _eval_text(ev: Dict[str, Any], white_mates: Optional[bool], classification: Optional[str]) -> str:
+        if white_mates is not None:
+            mate = abs(ev["score_mate"])
+            if mate == 0:
+                return "1-0" if white_mates else "0-1"
+            return f"M{mate}" if white_mates else f"-M{mate}"
+        if ev.get("score_cp") is not None:
+            return f"{ev['score_cp'] / 100:+.1f}"
+        if classification == "Book":
+            return "Book"
+        return ""
+        
+    @staticmethod
+    def _bar_percent(ev: Dict[str, Any], white_mates: Optional[bool]) -> float:
+        # Sigmoid: 1 / (1 + exp(-k * cp)), k=0.004 maps +/- 1000 to near 0/1
+        if white_mates is not None:
+            return 100.0 if white_mates else 0.0
+        if ev.get("score_cp") is None:
+            return 50.0
+        return 100.0 / (1.0 + math.exp(-0.004 * ev["score_cp"]))
+        
+    @staticmethod
+    def _graph_value(ev: Dict[str, Any], white_mates: Optional[bool], prev: int) -> int:
+        if white_mates is not None:
+            return GRAPH_CLAMP_CP if white_mates else -GRAPH_CLAMP_CP
+        if ev.get("score_cp") is None:
+            # No eval (book move or engine missing): keep the line flat
+            return prev
+        return max(-GRAPH_CLAMP_CP, min(GRAPH_CLAMP_CP, ev["score_cp"]))
+        
+    @staticmethod
+    def _graph(values: List[int]) -> Dict[str, Any]:
+        step = GRAPH_WIDTH / max(1, len(values) - 1)
+        points = []
+        for i, v in enumerate(values):
+            x = round(i * step, 1)
+            y = round(GRAPH_HEIGHT / 2 - v / GRAPH_CLAMP_CP * GRAPH_HEIGHT / 2, 1)
+            points.append([x, y])
+            
+        # Filled area for White's share, closed along the bottom edge
+        path = "M0," + str(GRAPH_HEIGHT) + " " + " ".join(f"L{x},{y}" for x, y in points)
+        path += f" L{points[-1][0]},{GRAPH_HEIGHT} Z"
+        return {
+            "width": GRAPH_WIDTH,
+            "height": GRAPH_HEIGHT,
+            "path": path,
+            "points": points
+        }
@@ -0,0 +1,346 @@
+import os
+import json
+import cv2
+import chess
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any
+from otbtagreview.io.paths import PGN_FILE, ANALYSIS_FILE, PAGE_FILE, STATES_FILE, DEBUG_DIR, output_path
+from .board import BoardWarper, Calibration
+from .tags import DetectedTag, TagDetector
+from .mapping import SquareMapper
+from .states import BoardState, StateManager
+from .moves import MoveInferrer
+from .engine import AnalysisWorker
+from .review import ReviewGenerator
+from .site import write_review_page
+
+@dataclass
+class BoardConfig:
+    """
+    One board in the camera view. An empty name is used for single-board runs.
+    """
+    name: str
+    corner_ids: List[int]
+    piece_map: Dict[str, str]
+    outdir: str
+    calibration: Optional[Calibration] = None
+
+
+def load_board_configs(path: str) -> List[BoardConfig]:
+    """
+    Read a boards file:
+    {"boards": [{"name": "board1", "corners": [0, 1, 2, 3],
+                 "piece_map": "pm1.json", "outdir": "out/board1",
+                 "calibration": "cal1.json"}, ...]}
+    Relative paths are resolved against the boards file's directory.
+    "calibration" is optional; a calibrated board uses the calibration's
+    corner IDs, and "corners" may be left out. Piece IDs may repeat between
+    boards; corner IDs must be unique across all boards and piece maps.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p: str) -> str:
+        return p if os.path.isabs(p) else os.path.join(base, p)
+
+    configs = []
+    for i, entry in enumerate(data.get("boards", [])):
+        corners = entry.get("corners", [0, 1, 2, 3])
+        if isinstance(corners, str):
+            corners = [int(x) for x in corners.split(',')]
+        if len(corners) != 4:
+            raise ValueError(f"Board {i}: must provide exactly 4 corner IDs")
+
+        with open(resolve(entry["piece_map"]), 'r') as f:
+            pmap = json.load(f)
+
+        calibration = None
+        if entry.get("calibration"):
+            calibration = Calibration.load(resolve(entry["calibration"]))
+            if "corners" in entry and [int(c) for c in corners] != list(calibration.corner_ids):
+                raise ValueError(f"Board {i}: corners {list(corners)} differ from the calibration's "
+                                 f"{list(calibration.corner_ids)}")
+            corners = calibration.corner_ids
+
+        configs.append(BoardConfig(
+            name=entry.get("name", f"board{i + 1}"),
+            corner_ids=[int(c) for c in corners],
+            piece_map=pmap,
+            outdir=resolve(entry["outdir"]),
+            calibration=calibration
+        ))
+
+    names = [c.name for c in configs]
+    if len(set(names)) != len(names):
+        raise ValueError("Board names must be unique")
+    check_corner_ids(configs)
+    return configs
+
+
+def check_corner_ids(configs: List[BoardConfig]):
+    """
+    Homographies are computed from tags looked up by ID, so a corner ID seen
+    twice in the frame (another board's corner or any board's piece) would
+    silently pick the wrong marker.
+    """
+    owner: Dict[int, str] = {}
+    for config in configs:
+        for corner_id in config.corner_ids:
+            if corner_id in owner:
+                raise ValueError(f"Corner ID {corner_id} is used by both {owner[corner_id]} and {config.name}")
+            owner[corner_id] = config.name
+    for config in configs:
+        for tag_id in config.piece_map:
+            if int(tag_id) in owner:
+                raise ValueError(f"Tag {tag_id} in the piece map of {config.name} "
+                                 f"is a corner ID of {owner[int(tag_id)]}")
+
+
+def union_roi(rois: List[Optional[Tuple[int, int, int, int]]]) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Smallest box covering every ROI; None if any of them is unknown.
+    """
+    if not rois or any(r is None for r in rois):
+        return None
+    x0 = min(r[0] for r in rois)
+    y0 = min(r[1] for r in rois)
+    x1 = max(r[0] + r[2] for r in rois)
+    y1 = max(r[1] + r[3] for r in rois)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class BoardSession:
+    """
+    Per-board pipeline state: homography, square mapping, state history and
+    move inference for one board. Tags are detected once per frame by the
+    caller and handed to every board that needs them.
+    """
+    def __init__(self, config: BoardConfig, worker: AnalysisWorker,
+                 drift_check_every: int = 10, drift_tolerance: float = 8.0,
+                 frame_size: Optional[Tuple[int, int]] = None,
+                 detector_params: Optional[Dict[str, Any]] = None):
+        """
+        frame_size: (width, height) of the video; must match the calibration's.
+        detector_params: DetectorParameters overrides for the full-frame search
+        made when the corner markers are not found in the board ROI.
+        """
+        self.config = config
+        self.name = config.name
+        self.worker = worker
+        self.drift_check_every = drift_check_every
+        self.drift_tolerance = drift_tolerance
+
+        self.warper = BoardWarper()
+        self.mapper = SquareMapper()
+        self.calibration = config.calibration
+        # ROI searched for tags (fixed mount only) and ROI judged for motion
+        self.detect_roi: Optional[Tuple[int, int, int, int]] = None
+        self.motion_roi: Optional[Tuple[int, int, int, int]] = None
+        self.frame_detector = TagDetector(params=detector_params)
+        if self.calibration:
+            if frame_size and list(frame_size) != list(self.calibration.frame_size):
+                w, h = self.calibration.frame_size
+                raise ValueError(f"Calibration{' for ' + self.name if self.name else ''} was made on "
+                                 f"{w}x{h} frames but the video is {frame_size[0]}x{frame_size[1]}")
+            self.warper.apply_calibration(self.calibration)
+            self.mapper = SquareMapper(board_size=self.calibration.output_size,
+                                       white_at_bottom=self.calibration.white_at_bottom)
+            self.detect_roi = tuple(self.calibration.roi)
+            self.motion_roi = self.detect_roi
+
+        self.state_mgr = StateManager()
+        self.move_inf = MoveInferrer(config.piece_map)
+        self.prev_state = None
+        self.stable_count = 0
+        # Inferred moves with the frame of the state they were inferred at
+        self.moves: List[Dict[str, Any]] = []
+
+        os.makedirs(config.outdir, exist_ok=True)
+        self.debug_dir = output_path(config.outdir, DEBUG_DIR)
+        os.makedirs(self.debug_dir, exist_ok=True)
+
+    def _log(self, msg: str):
+        if self.name:
+            msg = f"[{self.name}] {msg}"
+        print(msg)
+
+    def process(self, frame: np.ndarray, frame_idx: int, timestamp: float, tags: List[DetectedTag]):
+        self.stable_count += 1
+        corner_ids = self.warper.corner_ids if self.calibration else self.config.corner_ids
+
+        # 1. Homography
+        if self.calibration is None:
+            # Corner markers come from the shared detection pass
+            has_homography = self.warper.compute_homography_from_tags(tags, corner_ids)
+            if not has_homography and self.detect_roi is not None:
+                # Corners not all inside the board ROI (camera or board
+                # moved): search the whole frame and use those tags
+                frame_tags = self.frame_detector.detect(frame)
+                if self.warper.compute_homography_from_tags(frame_tags, corner_ids):
+                    has_homography = True
+                    tags = frame_tags
+
+            if not has_homography and self.warper.homography_matrix is None:
+                self._log(f"Frame {frame_idx}: Could not find corners and no previous homography. Skipping.")
+                return
+            if has_homography:
+                # Later detection passes only need to cover this board
+                self.detect_roi = self.warper.board_roi(frame.shape)
+                self.motion_roi = self.detect_roi
+        elif self.drift_check_every > 0:
+            # Fixed mount: corner markers are among the detected tags, so the
+            # drift check costs no extra detection. It runs every N stable
+            # frames, and at once if a visible corner marker has moved.
+            drift = self.warper.check_drift(tags)
+            moved = drift is not None and drift > self.drift_tolerance
+            if moved or self.stable_count % self.drift_check_every == 0:
+                in_roi = {t.tag_id for t in tags if t.tag_id in corner_ids}
+                if len(in_roi) < len(corner_ids) and (moved or drift is None):
+                    # The board may have moved (partly) out of the ROI: search
+                    # the whole frame, and use those tags if the board moved
+                    frame_tags = self.frame_detector.detect(frame)
+                    drift = self.warper.check_drift(frame_tags)
+                    if drift is None:
+                        self._log(f"Frame {frame_idx}: no corner markers visible, cannot check for board drift")
+                    elif drift > self.drift_tolerance:
+                        tags = frame_tags
+                if drift is not None and drift > self.drift_tolerance:
+                    if self.warper.compute_homography_from_tags(tags, corner_ids):
+                        self.detect_roi = self.warper.board_roi(frame.shape)
+                        self.motion_roi = self.detect_roi
+                        self._log(f"Frame {frame_idx}: board drifted {drift:.1f}px, homography re-locked")
+                    else:
+                        self._log(f"Frame {frame_idx}: board drifted {drift:.1f}px but not all corners visible, keeping calibration")
+
+        try:
+            warped = self.warper.warp(frame)
+        except Exception as e:
+            self._log(f"Frame {frame_idx}: Warp failed {e}")
+            return
+
+        # 2. Keep this board's piece tags; with several boards in view, tags
+        # of the same ID on other boards fall outside this board's squares
+        tags = [t for t in tags if str(t.tag_id) in self.config.piece_map and t.tag_id not in corner_ids]
+
+        # Warp tag centers
+        if tags:
+            tag_centers = np.array([t.center for t in tags])
+            warped_centers = self.warper.warp_points(tag_centers)
+        else:
+            warped_centers = []
+
+        # 3. Map to Squares
+        square_tag_map = {} # "e4" -> tag_id
+
+        debug_img = warped.copy()
+
+        for i, tag in enumerate(tags):
+            wx, wy = warped_centers[i]
+            sq = self.mapper.point_to_square(wx, wy)
+
+            if sq:
+                # Resolve conflict? If multiple tags on same square?
+                # Take the one closest to center?
+                # For now just overwrite (or could check confidence)
+                square_tag_map[sq] = tag.tag_id
+
+                # Draw for debug
+                cv2.circle(debug_img, (int(wx), int(wy)), 5, (0, 255, 0), -1)
+                cv2.putText(debug_img, f"{tag.tag_id}:{sq}", (int(wx), int(wy)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+        cv2.imwrite(os.path.join(self.debug_dir, f"frame_{frame_idx}_warped.jpg"), debug_img)
+
+        # 4. Create State
+        curr_state = self.state_mgr.create_state(square_tag_map, timestamp, frame_idx)
+
+        # 5. Infer Move
+        self._advance(curr_state)
+
+    def _advance(self, curr_state: BoardState):
+        # We might have multiple stable frames for the same position,
+        # so only infer a move when the placement changed.
+        if self.prev_state and curr_state.placement != self.prev_state.placement:
+            board_before = self.move_inf.board.copy()
+            move = self.move_inf.infer_move(self.prev_state, curr_state)
+            if move:
+                self._log(f"inferred move: {move} at {curr_state.timestamp:.2f}s")
+                self.moves.append({
+                    "ply": len(self.moves) + 1,
+                    "uci": move.uci(),
+                    "san": board_before.san(move),
+                    "frame_idx": curr_state.frame_idx,
+                    "timestamp": curr_state.timestamp
+                })
+                self.worker.submit(board_before, move)
+            else:
+                self._log(f"state changed but no valid move found at {curr_state.timestamp:.2f}s")
+
+        self.prev_state = curr_state
+
+    def resume(self, states: List[BoardState], moves: List[Dict[str, Any]], analyzed: int = 0):
+        """
+        Continue a stored run instead of starting from the initial position.
+        states: stored states up to the point where processing resumes.
+        moves: the stored moves inferred from those states.
+        analyzed: how many of those moves the worker already has results for;
+        the rest are submitted for analysis.
+        """
+        self.state_mgr.history = list(states)
+        self.prev_state = states[-1] if states else None
+        for i, entry in enumerate(moves):
+            board_before = self.move_inf.board.copy()
+            move = chess.Move.from_uci(entry["uci"])
+            self.move_inf.push(move)
+            self.moves.append(dict(entry))
+            if i >= analyzed:
+                self.worker.submit(board_before, move)
+
+    def replay_states(self, states: List[BoardState]):
+        """
+        Run move inference over stored states without touching the video.
+        """
+        for state in states:
+            self.state_mgr.history.append(state)
+            self._advance(state)
+
+    def finish(self):
+        """
+        Write game.pgn and states.json, wait for the engine and write
+        analysis.json and the review page.
+        """
+        outdir = self.config.outdir
+
+        pgn_path = output_path(outdir, PGN_FILE)
+        with open(pgn_path, "w") as f:
+            f.write(self.move_inf.get_pgn())
+        self._log(f"PGN saved to {pgn_path}")
+
+        # Board states and where each move was inferred, for the fix command
+        with open(output_path(outdir, STATES_FILE), "w") as f:
+            json.dump({
+                "states": [s.to_dict() for s in self.state_mgr.history],
+                "moves": self.moves
+            }, f)
+
+        # Wait for the engine to catch up with the last inferred moves
+        if self.worker.pending():
+            self._log(f"Waiting for Stockfish to finish {self.worker.pending()} queued moves...")
+        analyzed_moves = self.worker.finish()
+
+        game_info = dict(self.move_inf.game.headers)
+        analysis = {
+            "moves": analyzed_moves,
+            "game_info": game_info
+        }
+
+        # Write JSON for reference
+        with open(output_path(outdir, ANALYSIS_FILE), "w") as f:
+            json.dump(analysis, f, indent=2)
+
+        # Single self-contained review page (styles, script and render data inlined)
+        review = ReviewGenerator().generate_review(analyzed_moves)
+        page_path = output_path(outdir, PAGE_FILE)
+        write_review_page(page_path, review, game_info)
+        self._log(f"Review page saved to {page_path}")
@@ -0,0 +1,51 @@
+import os
+import re
+import json
+from typing import Dict, Any
+
+WEB_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'web')
+
+def _read_asset(name: str) -> str:
+    with open(os.path.join(WEB_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def minify_css(text: str) -> str:
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{}:;,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+def minify_js(text: str) -> str:
+    """
+    Conservative: drops comment-only lines, indentation and blank lines.
+    Line breaks are kept so statement boundaries never change.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+def _json_for_script(data: Any) -> str:
+    # A literal "<" could end (or comment out) the <script> element early
+    return json.dumps(data, separators=(',', ':')).replace('<', '\\u003c')
+
+def write_review_page(out_path: str, review: Dict[str, Any], game_info: Dict[str, str]):
+    """
+    Write the review page as one self-contained HTML file: styles, script
+    and precomputed render data are inlined, nothing is fetched at load time.
+    """
+    template = _read_asset('index.html')
+    data = {"review": review, "game_info": game_info}
+
+    parts = {
+        "styles": '<style>' + minify_css(_read_asset('styles.css')) + '</style>',
+        "data": '<script>window.GAME_DATA=' + _json_for_script(data) + ';</script>',
+        "app": '<script>' + minify_js(_read_asset('app.js')) + '</script>',
+    }
+    html = re.sub(r'<!-- @(\w+) -->', lambda m: parts[m.group(1)], template)
+
+    with open(out_path, 'w', encoding='utf-8') as f:
+        f.write(html)
@@ -15,6 +15,14 @@ class BoardState:
             "timestamp": self.timestamp,
             "frame_idx": self.frame_idx
         }
+        
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            placement=data["placement"],
+            timestamp=data["timestamp"],
+            frame_idx=data["frame_idx"]
+        )
 
 class StateManager:
     def __init__(self):
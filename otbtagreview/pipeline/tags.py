@@ -1,30 +1,297 @@
 import cv2
+import json
+import os
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Any, Optional
 from dataclasses import dataclass
 
+# Named overrides on top of cv2.aruco.DetectorParameters().
+# "robust" is OpenCV's default search: three adaptive-threshold windows and
+# a permissive candidate filter. The other profiles trade that margin for speed
+# on fixed rigs with good lighting.
+DETECTOR_PROFILES: Dict[str, Dict[str, Any]] = {
+    "robust": {},
+    "balanced": {
+        "adaptiveThreshWinSizeMin": 7,
+        "adaptiveThreshWinSizeMax": 15,
+        "adaptiveThreshWinSizeStep": 8,
+        "minMarkerPerimeterRate": 0.03,
+        "polygonalApproxAccuracyRate": 0.05,
+    },
+    "fast": {
+        "adaptiveThreshWinSizeMin": 11,
+        "adaptiveThreshWinSizeMax": 11,
+        "adaptiveThreshWinSizeStep": 10,
+        "minMarkerPerimeterRate": 0.04,
+        "polygonalApproxAccuracyRate": 0.05,
+    },
+}
+
+DEFAULT_DETECTOR_PROFILE = "robust"
+
+# Multi-scale detection: full-res corner refinement, the search area
+# around a missing tag (in tag sizes on each side) and how many calls a tag
+# missing at every scale (e.g. captured) stays expected. A tag that moved
+# is searched for where the image changed since the last call on the same
+# region: pixels changing by more than CHANGE_THRESHOLD, and the whole
+# region only when more than MAX_CHANGED_AREAS areas changed (e.g. a
+# lighting change). After COARSE_FAIL_LIMIT calls in a row where the coarse
+# level finds under half the expected tags, detection drops to full
+# resolution.
+SUBPIX_CRITERIA = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.01)
+FALLBACK_PAD = 1.0
+MAX_MISSES = 3
+CHANGE_THRESHOLD = 40
+MAX_CHANGED_AREAS = 8
+COARSE_FAIL_LIMIT = 3
+
+
+def resolve_detector_profile(spec: Optional[str]) -> Dict[str, Any]:
+    """
+    Turn a profile name ("fast", "balanced", "robust") or the path of a
+    profile JSON file (as written by tools/autotune_detector.py) into a dict
+    of DetectorParameters overrides.
+    """
+    if not spec:
+        spec = DEFAULT_DETECTOR_PROFILE
+
+    if spec in DETECTOR_PROFILES:
+        return dict(DETECTOR_PROFILES[spec])
+
+    if not os.path.exists(spec):
+        raise ValueError(f"Unknown detector profile: {spec} "
+                         f"(expected one of {', '.join(DETECTOR_PROFILES)} or a profile JSON file)")
+
+    with open(spec, 'r') as f:
+        data = json.load(f)
+
+    # A file may build on a named profile and override some of its fields
+    params = dict(DETECTOR_PROFILES.get(data.get("base", ""), {}))
+    params.update(data.get("params", {}))
+    return params
+
+
+def build_detector_parameters(overrides: Optional[Dict[str, Any]] = None) -> "cv2.aruco.DetectorParameters":
+    parameters = cv2.aruco.DetectorParameters()
+    for name, value in (overrides or {}).items():
+        if not hasattr(parameters, name):
+            raise ValueError(f"Unknown DetectorParameters field: {name}")
+        setattr(parameters, name, value)
+    return parameters
+
+
 @dataclass
 class DetectedTag:
     tag_id: int
     center: Tuple[float, float]
     corners: np.ndarray
-    confidence: float = 1.0 
+    confidence: float = 1.0
 
 class TagDetector:
-    def __init__(self, dict_type=cv2.aruco.DICT_4X4_50):
+    def __init__(self, dict_type=cv2.aruco.DICT_4X4_50, params: Optional[Dict[str, Any]] = None,
+                 pyramid_level: int = 0):
+        """
+        params: DetectorParameters overrides, see resolve_detector_profile().
+        pyramid_level: 0 detects at full resolution. N > 0 detects on the
+        image downscaled by 2^N and refines the corners at full resolution.
+        Expected tags missing at that scale are searched for at full
+        resolution, first in their last known area and then, if a tag has
+        moved, in the areas that changed since the last call on the same
+        region.
+        """
         self.aruco_dict = cv2.aruco.getPredefinedDictionary(dict_type)
-        self.parameters = cv2.aruco.DetectorParameters()
+        self.parameters = build_detector_parameters(params)
         self.detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.parameters)
-        
-    def detect(self, frame: np.ndarray) -> List[DetectedTag]:
+        self.pyramid_level = pyramid_level
+        # Last known full-frame corners per tag id (multi-scale mode only)
+        self.last_seen: Dict[int, np.ndarray] = {}
+        # Consecutive calls an expected tag was not found at any scale
+        self.misses: Dict[int, int] = {}
+        # Last downscaled image per searched region, to find where pieces moved
+        self.previous: Dict[Tuple, np.ndarray] = {}
+        # Consecutive calls where the coarse level found under half the expected tags
+        self.coarse_failures = 0
+
+    def detect(self, frame: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> List[DetectedTag]:
+        """
+        roi: optional (x, y, w, h) region to search; results are still in
+        full-frame coordinates.
+        """
+        offset = (0, 0)
+        if roi is not None:
+            x, y, w, h = roi
+            frame = frame[y:y + h, x:x + w]
+            offset = (x, y)
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return self._detect(gray, offset)
+
+    def detect_gray(self, gray: np.ndarray, roi: Optional[Tuple[int, int, int, int]] = None) -> List[DetectedTag]:
+        offset = (0, 0)
+        if roi is not None:
+            x, y, w, h = roi
+            gray = gray[y:y + h, x:x + w]
+            offset = (x, y)
+        return self._detect(gray, offset)
+
+    def _detect(self, gray: np.ndarray, offset: Tuple[int, int]) -> List[DetectedTag]:
+        if self.pyramid_level > 0 and self.last_seen:
+            return self._detect_multiscale(gray, offset)
+
+        # Seed the expected tags with a full-resolution pass
+        results = self._detect_full(gray, offset)
+        if self.pyramid_level > 0:
+            self.last_seen = {t.tag_id: t.corners for t in results}
+            self.misses = {}
+            self._remember(gray, offset, self._downscale(gray))
+        return results
+
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        small = gray
+        for _ in range(self.pyramid_level):
+            small = cv2.pyrDown(small)
+        return small
+
+    def _remember(self, gray: np.ndarray, offset: Tuple[int, int], small: np.ndarray) -> Optional[np.ndarray]:
+        """Store the downscaled image of this region; returns the previous one."""
+        key = (offset, gray.shape[:2])
+        previous = self.previous.pop(key, None)
+        self.previous[key] = small
+        if len(self.previous) > 16:
+            del self.previous[next(iter(self.previous))]
+        return previous
+
+    def _detect_multiscale(self, gray: np.ndarray, offset: Tuple[int, int]) -> List[DetectedTag]:
+        scale = 2 ** self.pyramid_level
+        small = self._downscale(gray)
+        previous = self._remember(gray, offset, small)
+
+        corners, ids, rejected = self.detector.detectMarkers(small)
+
+        results = []
+        if ids is not None:
+            # Map pyramid pixel centers back to full resolution, then refine there
+            pts = ((np.concatenate([c.reshape(-1, 2) for c in corners]) + 0.5) * scale - 0.5).astype(np.float32)
+            win = scale + 1
+            pts = cv2.cornerSubPix(gray, pts.reshape(-1, 1, 2), (win, win), (-1, -1), SUBPIX_CRITERIA).reshape(-1, 4, 2)
+            results = self._make_tags(ids, pts, offset)
+
+        # Full-resolution search, first where an expected tag went missing
+        found = {t.tag_id for t in results}
+        carried = {}
+        missing = []
+        expected = 0
+        coarse_hits = 0
+        sizes = []
+        h, w = gray.shape[:2]
+        for tag_id, last in self.last_seen.items():
+            local = last - np.array(offset, dtype=np.float32)
+            x0, y0 = local.min(axis=0)
+            x1, y1 = local.max(axis=0)
+            size = max(x1 - x0, y1 - y0)
+            pad = size * FALLBACK_PAD
+            x0 = int(max(0, x0 - pad))
+            y0 = int(max(0, y0 - pad))
+            x1 = int(min(w, x1 + pad))
+            y1 = int(min(h, y1 + pad))
+            if x1 <= x0 or y1 <= y0:
+                # Outside the searched region (e.g. another board's ROI): still expected
+                carried[tag_id] = last
+                continue
+            expected += 1
+            sizes.append(size)
+            if tag_id in found:
+                coarse_hits += 1
+                continue
+            patch_offset = (offset[0] + x0, offset[1] + y0)
+            for tag in self._detect_full(gray[y0:y1, x0:x1], patch_offset):
+                if tag.tag_id == tag_id:
+                    results.append(tag)
+                    found.add(tag_id)
+                    break
+            else:
+                missing.append(tag_id)
+
+        # A moved piece is no longer in its last known area: search where
+        # the image changed (the squares it left and landed on)
+        if missing:
+            pad = int(np.median(sizes)) if sizes else 0
+            for x0, y0, x1, y1 in self._changed_areas(previous, small, scale, pad, w, h):
+                patch_offset = (offset[0] + x0, offset[1] + y0)
+                for tag in self._detect_full(gray[y0:y1, x0:x1], patch_offset):
+                    if tag.tag_id not in found:
+                        results.append(tag)
+                        found.add(tag.tag_id)
+
+        # Tags missing at every scale (e.g. captured) stay expected for a
+        # few calls, then stop triggering full-resolution searches
+        for tag_id in missing:
+            if tag_id in found:
+                continue
+            misses = self.misses.get(tag_id, 0) + 1
+            if misses < MAX_MISSES:
+                self.misses[tag_id] = misses
+                carried[tag_id] = self.last_seen[tag_id]
+            else:
+                self.misses.pop(tag_id, None)
+
+        for tag in results:
+            self.misses.pop(tag.tag_id, None)
+            carried[tag.tag_id] = tag.corners
+        self.last_seen = carried
+
+        # Tags too small to decode at this level: every call pays for the
+        # coarse pass and the patch searches, so detect at full resolution
+        if expected and coarse_hits * 2 < expected:
+            self.coarse_failures += 1
+            if self.coarse_failures >= COARSE_FAIL_LIMIT:
+                print(f"Warning: pyramid level {self.pyramid_level} found {coarse_hits}/{expected} tags "
+                      f"for {self.coarse_failures} frames, detecting at full resolution instead")
+                self.pyramid_level = 0
+                self.previous = {}
+        else:
+            self.coarse_failures = 0
+        return results
+
+    def _changed_areas(self, previous: Optional[np.ndarray], small: np.ndarray, scale: int,
+                       pad: int, w: int, h: int) -> List[Tuple[int, int, int, int]]:
+        """
+        Full-resolution (x0, y0, x1, y1) boxes around the pixels that changed
+        between two downscaled images of the same region, padded by a tag
+        size. Without a previous image, or when too much changed, the whole
+        region.
+        """
+        if previous is None or previous.shape != small.shape:
+            return [(0, 0, w, h)]
+        mask = (cv2.absdiff(previous, small) > CHANGE_THRESHOLD).astype(np.uint8)
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        if count - 1 > MAX_CHANGED_AREAS:
+            return [(0, 0, w, h)]
+
+        areas = []
+        for x, y, bw, bh, _ in stats[1:]:
+            areas.append((
+                max(0, x * scale - pad),
+                max(0, y * scale - pad),
+                min(w, (x + bw) * scale + pad),
+                min(h, (y + bh) * scale + pad),
+            ))
+        return areas
+
+    def _detect_full(self, gray: np.ndarray, offset: Tuple[int, int]) -> List[DetectedTag]:
         corners, ids, rejected = self.detector.detectMarkers(gray)
-        
+        if ids is None:
+            return []
+        return self._make_tags(ids, [c[0] for c in corners], offset)
+
+    def _make_tags(self, ids: np.ndarray, corners: List[np.ndarray], offset: Tuple[int, int]) -> List[DetectedTag]:
+        offset = np.array(offset, dtype=np.float32)
+
         results = []
         if ids is not None:
             ids = ids.flatten()
             for i, marker_id in enumerate(ids):
-                c = corners[i][0] # (4, 2)
+                c = corners[i] + offset # (4, 2)
                 center = np.mean(c, axis=0)
                 results.append(DetectedTag(
                     tag_id=int(marker_id),
@@ -1,7 +1,12 @@
+import bisect
 import cv2
+import json
 import numpy as np
-from dataclasses import dataclass
-from typing import List, Generator, Tuple
+from dataclasses import dataclass, asdict
+from typing import List, Generator, Tuple, Dict, Optional, Any
+
+# Spacing of the seek points recorded in the video index
+SEEK_POINT_SECONDS = 2.0
 
 @dataclass
 class StableFrame:
@@ -10,6 +15,78 @@ class StableFrame:
     timestamp: float
     motion_score: float
 
+def motion_score(prev_gray: np.ndarray, gray: np.ndarray) -> float:
+    return float(np.mean(cv2.absdiff(prev_gray, gray)))
+
+def _crop(img: np.ndarray, roi: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
+    if roi is None:
+        return img
+    x, y, w, h = roi
+    return img[y:y + h, x:x + w]
+
+@dataclass
+class VideoIndex:
+    """
+    Built during a full pass over a video so later runs can jump into it.
+    Seek points are [frame_idx, timestamp_ms] pairs as reported by the
+    decoder; they let seek() check that the backend landed on the right frame.
+    """
+    video_path: str
+    fps: float
+    frame_count: int
+    seek_points: List[List[float]]
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VideoIndex":
+        return cls(**data)
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "VideoIndex":
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+class StabilityTracker:
+    """
+    Turns a stream of per-frame motion scores into stable frames: a run of
+    at least `min_stable_frames` frames below `motion_threshold` yields its
+    middle frame once the run ends.
+    """
+    def __init__(self, motion_threshold: float, min_stable_frames: int, fps: float):
+        self.motion_threshold = motion_threshold
+        self.min_stable_frames = min_stable_frames
+        self.fps = fps
+        self.stable_sequence = []
+        
+    def update(self, frame: np.ndarray, frame_idx: int, score: float) -> Optional[StableFrame]:
+        if score < self.motion_threshold:
+            # cap.read() returns a fresh array per frame, so keeping a
+            # reference is safe and lets several trackers share it
+            self.stable_sequence.append((frame, frame_idx, score))
+            return None
+        return self.flush()
+        
+    def flush(self) -> Optional[StableFrame]:
+        sequence = self.stable_sequence
+        self.stable_sequence = []
+        if len(sequence) < self.min_stable_frames:
+            return None
+        # Yield the middle frame of the stable sequence
+        mid_idx = len(sequence) // 2
+        best_frame, best_idx, best_score = sequence[mid_idx]
+        return StableFrame(
+            frame=best_frame,
+            frame_idx=best_idx,
+            timestamp=best_idx / self.fps,
+            motion_score=best_score
+        )
+
 class VideoProcessor:
     def __init__(self, video_path: str, motion_threshold: float = 5.0, stable_duration: float = 0.5):
         self.video_path = video_path
@@ -22,54 +99,127 @@ class VideoProcessor:
         if self.fps <= 0:
             self.fps = 30.0 # Fallback
         self.min_stable_frames = int(self.stable_duration * self.fps)
+        self.frame_size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        # Index of the next frame to be decoded
+        self.frame_pos = 0
+        self.seek_interval = max(1, int(round(SEEK_POINT_SECONDS * self.fps)))
+        self.seek_points: List[List[float]] = []
 
     def get_stable_frames(self) -> Generator[StableFrame, None, None]:
-        prev_frame = None
-        stable_sequence = []
-        frame_idx = 0
+        tracker = StabilityTracker(self.motion_threshold, self.min_stable_frames, self.fps)
+        
+        for frame_idx, frame, blurred, prev_blurred in self._iter_frames():
+            score = 1000.0
+            if prev_blurred is not None:
+                score = motion_score(prev_blurred, blurred)
+            
+            sf = tracker.update(frame, frame_idx, score)
+            if sf:
+                yield sf
+            
+        # Check end of video
+        sf = tracker.flush()
+        if sf:
+            yield sf
+            
+    def get_stable_frames_by_region(self, regions: Dict[str, Optional[Tuple[int, int, int, int]]],
+                                    end_frame: Optional[int] = None) -> Generator[Tuple[StableFrame, List[str]], None, None]:
+        """
+        Decode and motion-score the video once, judging stability separately
+        for each named region (x, y, w, h; None = whole frame).
+        
+        `regions` is read on every frame, so callers may fill in an ROI once
+        it becomes known. Yields (stable_frame, names) where names are the
+        regions that selected that frame. Decoding starts at the current
+        position (see seek()) and stops after `end_frame` if given.
+        """
+        trackers: Dict[str, StabilityTracker] = {}
+        
+        def tracker_for(name: str) -> StabilityTracker:
+            if name not in trackers:
+                trackers[name] = StabilityTracker(self.motion_threshold, self.min_stable_frames, self.fps)
+            return trackers[name]
+            
+        for frame_idx, frame, blurred, prev_blurred in self._iter_frames(end_frame):
+            emitted: Dict[int, Tuple[StableFrame, List[str]]] = {}
+            for name, roi in regions.items():
+                score = 1000.0
+                if prev_blurred is not None:
+                    score = motion_score(_crop(prev_blurred, roi), _crop(blurred, roi))
+                sf = tracker_for(name).update(frame, frame_idx, score)
+                if sf:
+                    emitted.setdefault(sf.frame_idx, (sf, []))[1].append(name)
+            yield from emitted.values()
+            
+        # Check end of video
+        emitted = {}
+        for name, tracker in trackers.items():
+            sf = tracker.flush()
+            if sf:
+                emitted.setdefault(sf.frame_idx, (sf, []))[1].append(name)
+        yield from emitted.values()
         
-        while True:
+    def _iter_frames(self, end_frame: Optional[int] = None):
+        """
+        Yields (frame_idx, frame, blurred gray, previous blurred gray).
+        """
+        prev_blurred = None
+        
+        while end_frame is None or self.frame_pos <= end_frame:
             ret, frame = self.cap.read()
             if not ret:
                 break
+            frame_idx = self.frame_pos
+            self.frame_pos += 1
+            if frame_idx % self.seek_interval == 0:
+                self.seek_points.append([frame_idx, self.cap.get(cv2.CAP_PROP_POS_MSEC)])
             
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            gray = cv2.GaussianBlur(gray, (21, 21), 0)
+            blurred = cv2.GaussianBlur(gray, (21, 21), 0)
             
-            score = 1000.0
-            if prev_frame is not None:
-                diff = cv2.absdiff(prev_frame, gray)
-                score = np.mean(diff)
+            yield frame_idx, frame, blurred, prev_blurred
             
-            prev_frame = gray
+            prev_blurred = blurred
             
-            if score < self.motion_threshold:
-                stable_sequence.append((frame.copy(), frame_idx, score))
+    def index(self) -> VideoIndex:
+        """
+        Index of the frames decoded so far; complete after a full pass from frame 0.
+        """
+        return VideoIndex(
+            video_path=self.video_path,
+            fps=self.fps,
+            frame_count=self.frame_pos,
+            seek_points=self.seek_points
+        )
+        
+    def seek(self, frame_idx: int, index: Optional[VideoIndex] = None):
+        """
+        Position the video so the next decoded frame is `frame_idx`.
+        
+        With an index, jump to the last seek point before the frame, check
+        the decoder's timestamp there against the index and grab forward.
+        Without one, or if the backend cannot seek accurately in this file,
+        grab forward from the start.
+        """
+        start = 0
+        points = index.seek_points if index else []
+        i = bisect.bisect_left([p[0] for p in points], frame_idx) - 1
+        if i >= 0 and points[i][0] > 0:
+            point_idx, point_ms = int(points[i][0]), points[i][1]
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, point_idx)
+            if self.cap.grab() and abs(self.cap.get(cv2.CAP_PROP_POS_MSEC) - point_ms) <= 500.0 / self.fps:
+                start = point_idx + 1
             else:
-                if len(stable_sequence) >= self.min_stable_frames:
-                    # Yield the middle frame of the stable sequence
-                    mid_idx = len(stable_sequence) // 2
-                    best_frame, best_idx, best_score = stable_sequence[mid_idx]
-                    yield StableFrame(
-                        frame=best_frame,
-                        frame_idx=best_idx,
-                        timestamp=best_idx / self.fps,
-                        motion_score=best_score
-                    )
-                stable_sequence = []
-                
-            frame_idx += 1
-            
-        # Check end of video
-        if len(stable_sequence) >= self.min_stable_frames:
-            mid_idx = len(stable_sequence) // 2
-            best_frame, best_idx, best_score = stable_sequence[mid_idx]
-            yield StableFrame(
-                frame=best_frame,
-                frame_idx=best_idx,
-                timestamp=best_idx / self.fps,
-                motion_score=best_score
-            )
+                print(f"Warning: seeking is not frame-accurate in {self.video_path}, decoding from the start")
+        
+        if start == 0:
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.video_path)
+        for _ in range(start, frame_idx):
+            if not self.cap.grab():
+                break
+        self.frame_pos = frame_idx
+        self.seek_points = []
             
     def release(self):
         self.cap.release()
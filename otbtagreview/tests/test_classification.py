@@ -0,0 +1,100 @@
+import chess
+from otbtagreview.pipeline.engine import AnalysisWorker
+from otbtagreview.pipeline.review import ReviewGenerator, MATE_CP
+
+
+class StubEngine:
+    """
+    Stands in for EngineAnalyzer: scores come from a {fen: eval} table,
+    anything else evaluates to 0.
+    """
+    def __init__(self, evals=None):
+        self.engine = object()
+        self.evals = evals or {}
+        self.analyzed = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def analyze(self, board):
+        self.analyzed.append(board.fen())
+        return dict(self.evals.get(board.fen(), {"score_cp": 0, "score_mate": None}))
+
+
+class StubBook:
+    def __init__(self, moves):
+        self.reader = object()
+        self.moves = set(moves)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def is_book_move(self, board, move):
+        return move.uci() in self.moves
+
+
+def run_worker(ucis, engine, book=None):
+    worker = AnalysisWorker(engine, book)
+    worker.start()
+    board = chess.Board()
+    for uci in ucis:
+        move = chess.Move.from_uci(uci)
+        worker.submit(board, move)
+        board.push(move)
+    return [r["classification"] for r in worker.finish()]
+
+
+def test_first_move_without_book_is_classified():
+    engine = StubEngine()
+    assert run_worker(["e2e4", "e7e5"], engine) == ["Best", "Best"]
+    # Start position analyzed as the baseline for ply 1
+    assert engine.analyzed[0] == chess.STARTING_FEN
+
+
+def test_first_move_out_of_book_is_classified():
+    classes = run_worker(["e2e4", "e7e5"], StubEngine(), StubBook(["d2d4"]))
+    assert classes == ["Best", "Best"]
+
+
+def test_book_moves_then_engine():
+    classes = run_worker(["e2e4", "e7e5", "g1f3"], StubEngine(), StubBook(["e2e4", "e7e5"]))
+    assert classes == ["Book", "Book", "Best"]
+
+
+def test_mate_scores_are_classified():
+    board = chess.Board()
+    fens = []
+    for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]:
+        board.push_uci(uci)
+        fens.append(board.fen())
+    evals = {
+        fens[1]: {"score_cp": -60, "score_mate": None},
+        fens[2]: {"score_cp": None, "score_mate": -1},
+        fens[3]: {"score_cp": None, "score_mate": 0},
+    }
+    classes = run_worker(["f2f3", "e7e5", "g2g4", "d8h4"], StubEngine(evals))
+    # 2.g4 walks into mate, 2...Qh4# delivers it
+    assert classes[2] == "Blunder"
+    assert classes[3] == "Best"
+    assert "Book" not in classes
+
+
+def test_eval_cp_folds_mates():
+    gen = ReviewGenerator()
+    assert gen.eval_cp({"score_cp": 35}, chess.STARTING_FEN) == 35
+    assert gen.eval_cp({"score_mate": 3}, chess.STARTING_FEN) == MATE_CP - 3
+    assert gen.eval_cp({"score_mate": -2}, chess.STARTING_FEN) == -(MATE_CP - 2)
+    assert gen.eval_cp({}, chess.STARTING_FEN) is None
+
+
+def test_missing_eval_is_unknown():
+    gen = ReviewGenerator()
+    assert gen.classify_move(None, 20, 3) == "Unknown"
+    assert gen.classify_move(10, None, 3) == "Unknown"
+    assert gen.classify_move(None, None, 0, in_book=True) == "Book"
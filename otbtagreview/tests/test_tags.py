@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+from otbtagreview.pipeline.tags import TagDetector, MAX_MISSES, COARSE_FAIL_LIMIT
+
+SIZE = 1200
+DICT = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_4X4_50)
+
+
+def render(tags, tag_px=80):
+    """A white frame with {tag_id: (x, y)} markers, (x, y) the top-left corner."""
+    frame = np.full((SIZE, SIZE, 3), 255, np.uint8)
+    for tag_id, (x, y) in tags.items():
+        marker = cv2.aruco.generateImageMarker(DICT, tag_id, tag_px)
+        frame[y:y + tag_px, x:x + tag_px] = cv2.cvtColor(marker, cv2.COLOR_GRAY2BGR)
+    return frame
+
+
+def count_whole_region(detector):
+    """Count full-resolution passes over the whole frame."""
+    calls = []
+    detect_full = detector._detect_full
+
+    def wrapped(gray, offset):
+        if gray.shape[:2] == (SIZE, SIZE):
+            calls.append(offset)
+        return detect_full(gray, offset)
+
+    detector._detect_full = wrapped
+    return calls
+
+
+def centers(results):
+    return {t.tag_id: t.center for t in results}
+
+
+START = {1: (100, 100), 2: (500, 100), 3: (900, 100), 4: (100, 600), 5: (500, 600)}
+
+
+def test_moved_tag_found_where_the_image_changed():
+    detector = TagDetector(pyramid_level=1)
+    whole = count_whole_region(detector)
+    assert set(centers(detector.detect(render(START)))) == set(START)
+
+    moved = {**START, 5: (900, 900)}
+    found = centers(detector.detect(render(moved)))
+    assert set(found) == set(START)
+    assert abs(found[5][0] - 940) < 2 and abs(found[5][1] - 940) < 2
+    # Only the seeding pass covers the whole frame
+    assert len(whole) == 1
+
+
+def test_captured_tag_stops_being_expected():
+    detector = TagDetector(pyramid_level=1)
+    whole = count_whole_region(detector)
+    detector.detect(render(START))
+
+    captured = {k: v for k, v in START.items() if k != 4}
+    for _ in range(MAX_MISSES + 2):
+        assert set(centers(detector.detect(render(captured)))) == set(captured)
+    assert 4 not in detector.last_seen
+    assert len(whole) == 1
+
+
+def test_falls_back_to_full_resolution_when_coarse_level_finds_nothing():
+    # 24 px tags are 3 px at level 3: too small to decode
+    detector = TagDetector(pyramid_level=3)
+    frame = render(START, tag_px=24)
+    for _ in range(COARSE_FAIL_LIMIT + 1):
+        assert set(centers(detector.detect(frame))) == set(START)
+    assert detector.pyramid_level == 0
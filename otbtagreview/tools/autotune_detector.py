@@ -0,0 +1,140 @@
+import cv2
+import click
+import json
+import time
+import itertools
+from typing import List, Dict, Any, Set
+from otbtagreview.pipeline.tags import TagDetector, DETECTOR_PROFILES
+
+# Search space. Each candidate is the product of one entry per axis.
+# Adaptive threshold windows are (min, max, step); a single window is the
+# biggest saving over the default three.
+THRESH_WINDOWS = [(3, 23, 10), (7, 23, 8), (7, 15, 8), (7, 7, 10), (11, 11, 10), (15, 15, 10), (23, 23, 10)]
+PERIMETER_RATES = [0.03, 0.05, 0.08]
+APPROX_RATES = [0.03, 0.05]
+ARUCO3 = [False, True]
+
+
+def candidate_profiles() -> List[Dict[str, Any]]:
+    candidates = []
+    for (wmin, wmax, wstep), perim, approx, aruco3 in itertools.product(THRESH_WINDOWS, PERIMETER_RATES, APPROX_RATES, ARUCO3):
+        params = {
+            "adaptiveThreshWinSizeMin": wmin,
+            "adaptiveThreshWinSizeMax": wmax,
+            "adaptiveThreshWinSizeStep": wstep,
+            "minMarkerPerimeterRate": perim,
+            "polygonalApproxAccuracyRate": approx,
+        }
+        if aruco3:
+            params.update({
+                "useAruco3Detection": True,
+                "minSideLengthCanonicalImg": 32,
+                "minMarkerLengthRatioOriginalImg": 0.02,
+            })
+        candidates.append(params)
+    return candidates
+
+
+def sample_frames(input_path: str, count: int) -> List:
+    """
+    Read `count` evenly spaced grayscale frames from the clip.
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {input_path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    step = max(1, total // count) if total > 0 else 1
+
+    frames = []
+    frame_idx = 0
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_idx % step == 0:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        frame_idx += 1
+    cap.release()
+    return frames
+
+
+def time_profile(params: Dict[str, Any], frames: List, repeats: int):
+    """
+    Returns (ms per frame, detected id set per frame) for one candidate.
+    """
+    try:
+        detector = TagDetector(params=params)
+    except (ValueError, cv2.error):
+        # Field not supported by this OpenCV build
+        return None, None
+
+    best = float('inf')
+    found = []
+    for _ in range(repeats):
+        found = []
+        start = time.perf_counter()
+        for gray in frames:
+            found.append({t.tag_id for t in detector.detect_gray(gray)})
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0 / len(frames), found
+
+
+@click.command()
+@click.option('--input', 'input_path', required=True, help='Calibration clip with every piece and corner marker visible')
+@click.option('--piece_map', required=True, help='Path to piece_map.json')
+@click.option('--corners', default='0,1,2,3', help='Corner tag IDs (TL,TR,BR,BL)')
+@click.option('--frames', 'frame_count', default=20, help='Number of frames sampled from the clip')
+@click.option('--repeats', default=2, help='Timing repeats per candidate (best is kept)')
+@click.option('--output', default='detector_profile.json', help='Output profile file (pass to analyze --detector_profile)')
+def main(input_path, piece_map, corners, frame_count, repeats, output):
+    """
+    Find the fastest ArUco detector settings that still detect every tag on a
+    calibration clip, and save them as a detector profile.
+    """
+    with open(piece_map, 'r') as f:
+        pmap = json.load(f)
+    expected: Set[int] = {int(k) for k in pmap.keys()} | {int(x) for x in corners.split(',')}
+
+    frames = sample_frames(input_path, frame_count)
+    if not frames:
+        print(f"Could not read from {input_path}")
+        return
+
+    # The default search defines what "detects every tag" means on this clip
+    baseline_ms, baseline_found = time_profile(DETECTOR_PROFILES["robust"], frames, repeats)
+    required = []
+    for i, found in enumerate(baseline_found):
+        missing = expected - found
+        if missing:
+            print(f"Warning: frame sample {i}: robust profile misses tags {sorted(missing)}")
+        required.append(expected & found)
+    print(f"Baseline (robust): {baseline_ms:.2f} ms/frame")
+
+    best_params = DETECTOR_PROFILES["robust"]
+    best_ms = baseline_ms
+    candidates = candidate_profiles()
+    for i, params in enumerate(candidates):
+        ms, found = time_profile(params, frames, repeats)
+        if ms is None:
+            continue
+        complete = all(req <= got for req, got in zip(required, found))
+        print(f" [{i + 1}/{len(candidates)}] {ms:.2f} ms/frame {'ok' if complete else 'misses tags'}")
+        if complete and ms < best_ms:
+            best_ms = ms
+            best_params = params
+
+    profile = {
+        "name": "autotuned",
+        "params": best_params,
+        "ms_per_frame": round(best_ms, 3),
+        "baseline_ms_per_frame": round(baseline_ms, 3),
+        "clip": input_path,
+    }
+    with open(output, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+    print(f"Best: {best_ms:.2f} ms/frame ({baseline_ms / best_ms:.1f}x faster than robust)")
+    print(f"Detector profile saved to {output}")
+
+if __name__ == '__main__':
+    main()
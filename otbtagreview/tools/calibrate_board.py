@@ -3,39 +3,65 @@ import click
 import json
 import numpy as np
 from otbtagreview.pipeline.board import BoardWarper
-from otbtagreview.pipeline.tags import TagDetector
+from otbtagreview.pipeline.tags import TagDetector, resolve_detector_profile, DEFAULT_DETECTOR_PROFILE
 from otbtagreview.pipeline.mapping import SquareMapper
 
 @click.command()
 @click.option('--input', 'input_path', required=True, help='Path to video or image')
 @click.option('--corners', required=True, help='Comma-separated list of 4 corner tag IDs (TL,TR,BR,BL)')
 @click.option('--output', default='calibration.jpg', help='Output image path')
-def main(input_path, corners, output):
+@click.option('--save', 'save_path', default='calibration.json', help='Calibration file for analyze --calibration')
+@click.option('--flip', is_flag=True, help='Black is at the bottom of the warped board (camera rotated 180 degrees)')
+@click.option('--step', default=5, help='Check every Nth frame while scanning for the corners')
+@click.option('--detector_profile', default=DEFAULT_DETECTOR_PROFILE, help='ArUco detector profile: fast, balanced, robust or a profile JSON file')
+def main(input_path, corners, output, save_path, flip, step, detector_profile):
     """
-    Calibrate board mapping on a sample frame.
+    Calibrate board mapping: scan the clip for the first frame with all four
+    corner markers, save the homography, board ROI and orientation, and draw
+    a verification overlay.
     """
     corner_ids = [int(x) for x in corners.split(',')]
     if len(corner_ids) != 4:
         raise ValueError("Must provide exactly 4 corner IDs")
         
-    # Read frame
+    detector_params = resolve_detector_profile(detector_profile)
+    warper = BoardWarper(detector_params=detector_params)
+    
+    # Scan until a frame shows all corners
     cap = cv2.VideoCapture(input_path)
-    ret, frame = cap.read()
+    frame = None
+    frame_idx = 0
+    found = False
+    while True:
+        ret, candidate = cap.read()
+        if not ret:
+            break
+        if frame_idx % step == 0:
+            frame = candidate
+            if warper.find_corners_and_compute_homography(frame, corner_ids):
+                found = True
+                break
+        frame_idx += 1
     cap.release()
     
-    if not ret:
+    if frame is None:
         print(f"Could not read from {input_path}")
         return
         
-    warper = BoardWarper()
-    if not warper.find_corners_and_compute_homography(frame, corner_ids):
-        print("Could not find all corner markers")
+    if not found:
+        print("Could not find all corner markers in any frame")
         return
         
+    print(f"Found all corner markers at frame {frame_idx}")
+    
+    calibration = warper.to_calibration(frame.shape, white_at_bottom=not flip)
+    calibration.save(save_path)
+    print(f"Calibration saved to {save_path} (ROI {calibration.roi})")
+        
     warped = warper.warp(frame)
     
     # Detect tags on original and warp centers
-    detector = TagDetector()
+    detector = TagDetector(params=detector_params)
     tags = detector.detect(frame)
     
     if not tags:
@@ -45,7 +71,7 @@ def main(input_path, corners, output):
         tag_centers = np.array([t.center for t in tags])
         warped_centers = warper.warp_points(tag_centers)
         
-        mapper = SquareMapper()
+        mapper = SquareMapper(white_at_bottom=not flip)
         
         # Draw on warped image
         for i, tag in enumerate(tags):
@@ -0,0 +1,174 @@
+// Review page. All positions, arrows and graph points are precomputed by the
+// pipeline (ReviewGenerator.generate_review), so this only draws them.
+(function () {
+    const GLYPHS = {
+        K: '♚', Q: '♛', R: '♜', B: '♝', N: '♞', P: '♟',
+        k: '♚', q: '♛', r: '♜', b: '♝', n: '♞', p: '♟'
+    };
+    const SVG_NS = 'http://www.w3.org/2000/svg';
+
+    const data = window.GAME_DATA || {};
+    const review = data.review || { plies: [], graph: null };
+    const plies = review.plies || [];
+
+    let currentPly = 0;
+    let flipped = false;
+    const squares = [];
+
+    function $(id) {
+        return document.getElementById(id);
+    }
+
+    function svg(tag, attrs) {
+        const el = document.createElementNS(SVG_NS, tag);
+        for (const key in attrs) {
+            el.setAttribute(key, attrs[key]);
+        }
+        return el;
+    }
+
+    function buildBoard() {
+        const boardEl = $('board');
+        for (let i = 0; i < 64; i++) {
+            const div = document.createElement('div');
+            boardEl.appendChild(div);
+            squares.push(div);
+        }
+    }
+
+    // Board index i (0 = a8 ... 63 = h1) is drawn at cell i, or 63 - i when flipped
+    function cellOf(index) {
+        return flipped ? 63 - index : index;
+    }
+
+    function drawBoard(ply) {
+        for (let cell = 0; cell < 64; cell++) {
+            const ch = ply.board[cellOf(cell)];
+            const row = Math.floor(cell / 8);
+            const col = cell % 8;
+            const div = squares[cell];
+            let cls = 'sq ' + ((row + col) % 2 === 0 ? 'light' : 'dark');
+            if (ch !== '.') {
+                cls += ch === ch.toUpperCase() ? ' w' : ' b';
+            }
+            div.className = cls;
+            div.textContent = ch === '.' ? '' : GLYPHS[ch];
+        }
+    }
+
+    function drawArrows(ply) {
+        const layer = $('arrows');
+        layer.textContent = '';
+        ply.arrows.forEach(function (arrow) {
+            const from = cellOf(arrow[0]);
+            const to = cellOf(arrow[1]);
+            const x1 = from % 8 + 0.5, y1 = Math.floor(from / 8) + 0.5;
+            const x2 = to % 8 + 0.5, y2 = Math.floor(to / 8) + 0.5;
+            const len = Math.hypot(x2 - x1, y2 - y1);
+            const ux = (x2 - x1) / len, uy = (y2 - y1) / len;
+            const head = 0.35;
+            const bx = x2 - ux * head, by = y2 - uy * head;
+            const cls = 'arrow-' + arrow[2];
+            layer.appendChild(svg('line', {
+                x1: x1, y1: y1, x2: bx, y2: by, 'stroke-width': 0.15, 'class': cls
+            }));
+            const pts = [
+                [x2, y2],
+                [bx - uy * head * 0.6, by + ux * head * 0.6],
+                [bx + uy * head * 0.6, by - ux * head * 0.6]
+            ].map(function (p) { return p[0] + ',' + p[1]; }).join(' ');
+            layer.appendChild(svg('polygon', { points: pts, 'class': cls }));
+        });
+    }
+
+    function buildGraph() {
+        const graph = review.graph;
+        const el = $('evalGraph');
+        if (!graph) {
+            el.style.display = 'none';
+            return;
+        }
+        el.setAttribute('viewBox', '0 0 ' + graph.width + ' ' + graph.height);
+        el.setAttribute('preserveAspectRatio', 'none');
+        el.appendChild(svg('path', { d: graph.path, 'class': 'area' }));
+        el.appendChild(svg('line', { id: 'graphCursor', 'class': 'cursor', x1: 0, y1: 0, x2: 0, y2: graph.height }));
+        el.addEventListener('click', function (ev) {
+            const rect = el.getBoundingClientRect();
+            const x = (ev.clientX - rect.left) / rect.width * graph.width;
+            const step = graph.width / Math.max(1, graph.points.length - 1);
+            goTo(Math.round(x / step));
+        });
+    }
+
+    function renderMoveList() {
+        const list = $('moveList');
+        list.textContent = '';
+        plies.slice(1).forEach(function (ply, index) {
+            const div = document.createElement('div');
+            div.className = 'move';
+            div.id = 'move-' + index;
+            div.textContent = ply.label + (ply.classification ? ' (' + ply.classification + ')' : '');
+            div.addEventListener('click', function () {
+                goTo(index + 1);
+            });
+            list.appendChild(div);
+        });
+    }
+
+    function updateUI() {
+        const ply = plies[currentPly];
+        if (!ply) return;
+
+        drawBoard(ply);
+        drawArrows(ply);
+
+        document.querySelectorAll('.move.active').forEach(function (el) {
+            el.classList.remove('active');
+        });
+        if (currentPly > 0) {
+            $('move-' + (currentPly - 1)).classList.add('active');
+        }
+
+        $('evalScore').textContent = currentPly > 0 ? (ply.eval_text || '-') : 'Start';
+        $('coachText').textContent = currentPly > 0 ? ply.classification : 'Game Start';
+        $('pvText').textContent = ply.pv.length ? 'Follow-up: ' + ply.pv.join(' ') : '';
+        $('evalBar').style.height = ply.bar + '%';
+
+        const cursor = $('graphCursor');
+        if (cursor && review.graph) {
+            const x = review.graph.points[currentPly][0];
+            cursor.setAttribute('x1', x);
+            cursor.setAttribute('x2', x);
+        }
+    }
+
+    function goTo(ply) {
+        currentPly = Math.max(0, Math.min(plies.length - 1, ply));
+        updateUI();
+    }
+
+    function init() {
+        if (!plies.length) {
+            console.error('No GAME_DATA found.');
+            return;
+        }
+        buildBoard();
+        buildGraph();
+        renderMoveList();
+
+        $('btnNext').addEventListener('click', function () { goTo(currentPly + 1); });
+        $('btnPrev').addEventListener('click', function () { goTo(currentPly - 1); });
+        $('btnFlip').addEventListener('click', function () {
+            flipped = !flipped;
+            updateUI();
+        });
+        document.addEventListener('keydown', function (ev) {
+            if (ev.key === 'ArrowRight') goTo(currentPly + 1);
+            if (ev.key === 'ArrowLeft') goTo(currentPly - 1);
+        });
+
+        updateUI();
+    }
+
+    init();
+})();